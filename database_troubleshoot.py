@@ -2,26 +2,69 @@
 
 import os
 import sys
+from functools import lru_cache
 from pathlib import Path
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 try:
+    import chromadb
     from config import config
     from langchain_chroma import Chroma
     from langchain_huggingface import HuggingFaceEmbeddings
+    from onnx_embeddings import OnnxEmbeddings, find_onnx_model, onnx_runtime_available
 except ImportError as e:
     print(f"Import error: {e}")
     print("Make sure you're in the right directory and dependencies are installed")
     sys.exit(1)
 
+@lru_cache(maxsize=1)
+def _get_embedder():
+    """Load the embedding model once and share it across all checks"""
+    # Match the app: the int8 ONNX export is only used when enabled in config
+    if config.USE_ONNX_EMBEDDINGS and onnx_runtime_available() and find_onnx_model(config.ONNX_EMBEDDING_DIR):
+        print("⚡ Using ONNX Runtime int8 embeddings")
+        return OnnxEmbeddings(config.ONNX_EMBEDDING_DIR)
+    
+    try:
+        import torch
+        torch.set_num_threads(os.cpu_count() or 1)
+    except ImportError:
+        pass
+    
+    return HuggingFaceEmbeddings(
+        model_name=config.EMBEDDING_MODEL,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+@lru_cache(maxsize=1)
+def _get_client():
+    """Open the persistent Chroma client once so every probe shares its sqlite connection"""
+    return chromadb.PersistentClient(path=config.CHROMA_DB_PATH_STR)
+
+def _walk(path, level=1):
+    """Yield (level, name, size) for a directory tree, size is None for directories"""
+    with os.scandir(path) as entries:
+        # Files first, then subdirectories, matching os.walk's listing order
+        dirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry)
+            else:
+                yield level, entry.name, entry.stat().st_size
+
+    for entry in dirs:
+        yield level, entry.name, None
+        yield from _walk(entry.path, level + 1)
+
 def check_database_structure():
     """Check the structure of the Chroma database"""
     print("🔍 TROUBLESHOOTING CHROMA DATABASE")
     print("=" * 50)
     
-    db_path = str(config.CHROMA_DB_PATH)
+    db_path = config.CHROMA_DB_PATH_STR
     print(f"📁 Database Path: {db_path}")
     
     if not os.path.exists(db_path):
@@ -30,16 +73,14 @@ def check_database_structure():
     
     # List all files in the database directory
     print("\n📂 Database Directory Contents:")
-    for root, dirs, files in os.walk(db_path):
-        level = root.replace(db_path, '').count(os.sep)
+    print(f"{os.path.basename(db_path)}/")
+    for level, name, size in _walk(db_path):
         indent = ' ' * 2 * level
-        print(f"{indent}{os.path.basename(root)}/")
-        subindent = ' ' * 2 * (level + 1)
-        for file in files:
-            file_path = os.path.join(root, file)
-            size = os.path.getsize(file_path)
-            print(f"{subindent}{file} ({size} bytes)")
-    
+        if size is None:
+            print(f"{indent}{name}/")
+        else:
+            print(f"{indent}{name} ({size} bytes)")
+
     return True
 
 def test_direct_chroma_access():
@@ -48,22 +89,9 @@ def test_direct_chroma_access():
     print("=" * 50)
     
     try:
-        # Initialize embedding model
-        print("📥 Loading embedding model...")
-        embedding_model = HuggingFaceEmbeddings(
-            model_name=config.EMBEDDING_MODEL,
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
-        print("✅ Embedding model loaded")
-        
-        # Try to load the vector store
+        # Open the collection directly - counting and peeking need no embedding model
         print("💎 Loading vector database...")
-        vectorstore = Chroma(
-            persist_directory=str(config.CHROMA_DB_PATH),
-            embedding_function=embedding_model,
-            collection_name=config.COLLECTION_NAME
-        )
+        collection = _get_client().get_collection(config.COLLECTION_NAME)
         print("✅ Vector store loaded")
         
         # Check the collection
@@ -71,11 +99,11 @@ def test_direct_chroma_access():
         print("-" * 30)
         
         # Get collection info
-        collection = vectorstore._collection
+        collection_count = collection.count()
         print(f"Collection name: {collection.name}")
-        print(f"Collection count: {collection.count()}")
+        print(f"Collection count: {collection_count}")
         
-        if collection.count() == 0:
+        if collection_count == 0:
             print("❌ Collection is empty!")
             return False
         
@@ -83,13 +111,13 @@ def test_direct_chroma_access():
         print("\n📖 SAMPLE DOCUMENTS")
         print("-" * 30)
         
-        # Get first few documents
-        results = collection.peek(limit=3)
-        if results and 'documents' in results:
-            for i, doc in enumerate(results['documents'][:3]):
+        # Get first few documents - unlike peek(), get() can skip the stored embeddings
+        results = collection.get(limit=3, include=['documents', 'metadatas'])
+        if results and results.get('documents'):
+            for i, doc in enumerate(results['documents']):
                 print(f"\nDocument {i+1}:")
                 print(f"Content preview: {doc[:200]}...")
-                if 'metadatas' in results and i < len(results['metadatas']):
+                if results.get('metadatas') and i < len(results['metadatas']):
                     print(f"Metadata: {results['metadatas'][i]}")
         
         # Test similarity search
@@ -97,18 +125,30 @@ def test_direct_chroma_access():
         print("-" * 30)
         
         test_queries = ["Harry Potter", "Hogwarts", "magic", "wizard"]
-        
-        for query in test_queries:
-            print(f"\nTesting query: '{query}'")
-            try:
-                docs = vectorstore.similarity_search(query, k=2)
+
+        try:
+            # Only load the embedding model once there is something to search
+            print("📥 Loading embedding model...")
+            embedding_model = _get_embedder()
+            print("✅ Embedding model loaded")
+            
+            # Embed all probes in one forward pass and query Chroma once
+            query_embeddings = embedding_model.embed_documents(test_queries)
+            search_results = collection.query(
+                query_embeddings=query_embeddings,
+                n_results=2,
+                include=['documents']
+            )
+
+            for query, docs in zip(test_queries, search_results['documents']):
+                print(f"\nTesting query: '{query}'")
                 print(f"  Found {len(docs)} documents")
                 if docs:
-                    print(f"  First result preview: {docs[0].page_content[:100]}...")
+                    print(f"  First result preview: {docs[0][:100]}...")
                 else:
                     print("  No documents found")
-            except Exception as e:
-                print(f"  Error: {e}")
+        except Exception as e:
+            print(f"  Error: {e}")
         
         return True
         
@@ -131,29 +171,25 @@ def test_different_collection_names():
     ]
     
     try:
-        embedding_model = HuggingFaceEmbeddings(
-            model_name=config.EMBEDDING_MODEL,
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        client = _get_client()
         
         for collection_name in possible_names:
             print(f"\n🔍 Trying collection: '{collection_name}'")
             try:
-                vectorstore = Chroma(
-                    persist_directory=str(config.CHROMA_DB_PATH),
-                    embedding_function=embedding_model,
-                    collection_name=collection_name
-                )
-                
-                collection = vectorstore._collection
+                # get_collection never creates an empty collection as a side effect
+                collection = client.get_collection(collection_name)
                 count = collection.count()
                 print(f"  Count: {count}")
                 
                 if count > 0:
                     print(f"  ✅ Found {count} documents in collection '{collection_name}'!")
                     
-                    # Test a simple search
+                    # Test a simple search - only the winner needs a vector store wrapper
+                    vectorstore = Chroma(
+                        client=client,
+                        embedding_function=_get_embedder(),
+                        collection_name=collection_name
+                    )
                     docs = vectorstore.similarity_search("Harry", k=1)
                     if docs:
                         print(f"  Sample doc: {docs[0].page_content[:100]}...")
@@ -9,18 +9,44 @@ Handles dependency conflicts and ensures clean installation
 import subprocess
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared pip invocation - non-interactive and without the version self-check
+PIP_INSTALL = f"{sys.executable} -m pip install --no-input --disable-pip-version-check"
+
+# Only the tail of a failed command's stderr is shown
+ERROR_TAIL_CHARS = 4096
 
 def run_command(command, description):
     """Run a command and handle errors"""
     print(f"🔄 {description}...")
-    try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+    # Discard stdout (pip progress can reach many MB) and keep only stderr for diagnosis
+    process = subprocess.Popen(command, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    _, stderr = process.communicate()
+
+    if process.returncode == 0:
         print(f"✅ {description} completed successfully")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ {description} failed:")
-        print(f"   Error: {e.stderr}")
-        return False
+
+    print(f"❌ {description} failed:")
+    print(f"   Error: {stderr[-ERROR_TAIL_CHARS:]}")
+    return False
+
+def install_group(deps, description):
+    """Install a group of packages in a single pip invocation"""
+    requirements = " ".join(f"'{dep}'" for dep in deps)
+    return run_command(f"{PIP_INSTALL} {requirements}", description)
+
+def try_import(module):
+    """Import a module, returning None on success or the error message"""
+    try:
+        __import__(module)
+        return None
+    except ImportError as e:
+        return str(e)
+    except Exception as e:
+        # Broken C extensions or import-lock errors only fail this one module
+        return f"{type(e).__name__}: {e}"
 
 def clean_install():
     """Perform a clean installation resolving dependency conflicts"""
@@ -28,7 +54,7 @@ def clean_install():
     print("=" * 60)
     
     # Step 1: Upgrade pip
-    if not run_command(f"{sys.executable} -m pip install --upgrade pip", "Upgrading pip"):
+    if not run_command(f"{PIP_INSTALL} --upgrade pip", "Upgrading pip"):
         return False
     
     # Step 2: Install core dependencies first (most stable versions)
@@ -42,12 +68,11 @@ def clean_install():
     ]
     
     print("\n📦 Installing core dependencies...")
-    for dep in core_deps:
-        if not run_command(f"{sys.executable} -m pip install '{dep}'", f"Installing {dep.split('>=')[0]}"):
-            print(f"⚠️ Warning: Failed to install {dep}")
+    if not install_group(core_deps, "Installing core dependencies"):
+        print("⚠️ Warning: Failed to install core dependencies")
     
     # Step 3: Install pydantic with proper version
-    if not run_command(f"{sys.executable} -m pip install 'pydantic>=2.7.0,<3.0.0'", "Installing Pydantic"):
+    if not install_group(["pydantic>=2.7.0,<3.0.0"], "Installing Pydantic"):
         return False
     
     # Step 4: Install LangChain ecosystem (compatible versions)
@@ -58,9 +83,8 @@ def clean_install():
     ]
     
     print("\n🦜 Installing LangChain ecosystem...")
-    for dep in langchain_deps:
-        if not run_command(f"{sys.executable} -m pip install '{dep}'", f"Installing {dep.split('>=')[0]}"):
-            print(f"⚠️ Warning: Failed to install {dep}")
+    if not install_group(langchain_deps, "Installing LangChain ecosystem"):
+        print("⚠️ Warning: Failed to install LangChain ecosystem")
     
     # Step 5: Install AI/ML libraries
     ai_deps = [
@@ -71,9 +95,8 @@ def clean_install():
     ]
     
     print("\n🧠 Installing AI/ML libraries...")
-    for dep in ai_deps:
-        if not run_command(f"{sys.executable} -m pip install '{dep}'", f"Installing {dep.split('>=')[0]}"):
-            print(f"⚠️ Warning: Failed to install {dep}")
+    if not install_group(ai_deps, "Installing AI/ML libraries"):
+        print("⚠️ Warning: Failed to install AI/ML libraries")
     
     # Step 6: Install remaining dependencies
     other_deps = [
@@ -82,14 +105,13 @@ def clean_install():
         "groq>=0.9.0",
         "gradio>=4.44.0",
         "python-dotenv>=1.0.1",
-        "httpx>=0.27.0",
+        "httpx[http2]>=0.27.0",
         "httpx-sse>=0.4.0"
     ]
     
     print("\n🔧 Installing remaining dependencies...")
-    for dep in other_deps:
-        if not run_command(f"{sys.executable} -m pip install '{dep}'", f"Installing {dep.split('>=')[0]}"):
-            print(f"⚠️ Warning: Failed to install {dep}")
+    if not install_group(other_deps, "Installing remaining dependencies"):
+        print("⚠️ Warning: Failed to install remaining dependencies")
     
     # Step 7: Final verification
     print("\n🔍 Verifying installation...")
@@ -104,13 +126,16 @@ def clean_install():
         ("groq", "Groq")
     ]
     
+    # Probe imports in parallel - most import time is I/O and C extension init
+    with ThreadPoolExecutor(max_workers=len(test_imports)) as executor:
+        import_errors = list(executor.map(try_import, [module for module, _ in test_imports]))
+    
     failed_imports = []
-    for module, name in test_imports:
-        try:
-            __import__(module)
+    for (module, name), error in zip(test_imports, import_errors):
+        if error is None:
             print(f"   ✅ {name}")
-        except ImportError as e:
-            print(f"   ❌ {name} - {str(e)}")
+        else:
+            print(f"   ❌ {name} - {error}")
             failed_imports.append(name)
     
     if failed_imports:
@@ -127,7 +152,7 @@ def alternative_install():
     print("\n🔄 Trying alternative installation method...")
     
     # First, try to resolve conflicts by upgrading all packages
-    if not run_command(f"{sys.executable} -m pip install --upgrade --force-reinstall -r requirements.txt", 
+    if not run_command(f"{PIP_INSTALL} --upgrade --force-reinstall -r requirements.txt", 
                       "Force reinstalling from requirements.txt"):
         return False
     
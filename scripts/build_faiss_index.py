@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# scripts/build_faiss_index.py - Build the FAISS index from the Chroma database
+
+"""
+🏰 Harry Potter RAG System - FAISS Index Builder 🏰
+Copies the stored embeddings out of the Chroma collection into a FAISS
+IndexHNSWFlat plus a SQLite docstore for the read-only FAISS backend.
+
+Requires: pip install faiss-cpu
+Enable afterwards with VECTOR_BACKEND = "faiss" in src/config.py
+"""
+
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+BATCH_SIZE = 1000
+
+def iter_collection(collection):
+    """Yield (embeddings, documents, metadatas) batches from a Chroma collection"""
+    total = collection.count()
+    for offset in range(0, total, BATCH_SIZE):
+        batch = collection.get(
+            limit=BATCH_SIZE,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        yield batch["embeddings"], batch["documents"], batch["metadatas"]
+
+def build_index(config):
+    """Build the HNSW index and docstore, returning the number of passages"""
+    import chromadb
+    import faiss
+    import numpy as np
+
+    collection = chromadb.PersistentClient(path=config.CHROMA_DB_PATH_STR).get_collection(config.COLLECTION_NAME)
+    print(f"📊 Collection '{config.COLLECTION_NAME}' contains {collection.count()} documents")
+
+    Path(config.FAISS_INDEX_PATH).parent.mkdir(parents=True, exist_ok=True)
+    docstore_path = Path(config.FAISS_DOCSTORE_PATH)
+    if docstore_path.exists():
+        docstore_path.unlink()
+
+    db = sqlite3.connect(str(docstore_path))
+    db.execute("CREATE TABLE documents (position INTEGER PRIMARY KEY, document TEXT NOT NULL, metadata TEXT)")
+
+    index = None
+    position = 0
+    for embeddings, documents, metadatas in iter_collection(collection):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if index is None:
+            index = faiss.IndexHNSWFlat(vectors.shape[1], config.FAISS_HNSW_M)
+            index.hnsw.efConstruction = config.FAISS_EF_CONSTRUCTION
+
+        index.add(vectors)
+        db.executemany(
+            "INSERT INTO documents (position, document, metadata) VALUES (?, ?, ?)",
+            [
+                (position + i, document, json.dumps(metadata) if metadata else None)
+                for i, (document, metadata) in enumerate(zip(documents, metadatas))
+            ]
+        )
+        position += len(vectors)
+        print(f"   ✅ Indexed {position} passages")
+
+    if index is None:
+        raise ValueError(f"Collection '{config.COLLECTION_NAME}' is empty - nothing to index")
+
+    db.commit()
+    db.close()
+    faiss.write_index(index, str(config.FAISS_INDEX_PATH))
+    return position
+
+def main():
+    """Main build function"""
+    print("🏰 HARRY POTTER RAG SYSTEM - FAISS INDEX BUILDER 🏰")
+    print("=" * 50)
+
+    try:
+        from config import config
+
+        count = build_index(config)
+        print(f"\n✅ Wrote {count} passages to: {config.FAISS_INDEX_PATH}")
+        print('💡 Set VECTOR_BACKEND = "faiss" in src/config.py to use it')
+        return True
+
+    except ImportError as e:
+        print(f"❌ Missing dependency: {e}")
+        print("💡 Install with: pip install faiss-cpu")
+        return False
+    except Exception as e:
+        print(f"❌ Index build failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
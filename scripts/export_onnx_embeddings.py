@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# scripts/export_onnx_embeddings.py - Export the embedding model to int8 ONNX
+
+"""
+⚡ Harry Potter RAG System - ONNX Embedding Export ⚡
+Exports the sentence-transformers model to ONNX and applies dynamic int8
+quantization so the RAG pipeline can serve embeddings with ONNX Runtime.
+
+Requires: pip install "optimum[onnxruntime]"
+Enable afterwards with USE_ONNX_EMBEDDINGS = True in src/config.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+def export_model(model_name, output_dir):
+    """Export model_name to ONNX and write an int8 quantized copy to output_dir"""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoTokenizer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        print(f"📦 Exporting {model_name} to ONNX...")
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(export_dir)
+
+        print("🔢 Applying dynamic int8 quantization...")
+        quantize_dynamic(
+            str(Path(export_dir) / "model.onnx"),
+            str(output_dir / "model_quantized.onnx"),
+            weight_type=QuantType.QInt8
+        )
+
+    # OnnxEmbeddings loads the fast tokenizer directly from tokenizer.json
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(str(output_dir))
+
+    return output_dir / "model_quantized.onnx"
+
+def main():
+    """Main export function"""
+    print("⚡ HARRY POTTER RAG SYSTEM - ONNX EXPORT ⚡")
+    print("=" * 50)
+
+    try:
+        from config import config
+
+        model_name = config.EMBEDDING_MODEL
+        if "/" not in model_name:
+            model_name = f"sentence-transformers/{model_name}"
+
+        model_path = export_model(model_name, config.ONNX_EMBEDDING_DIR)
+        print(f"✅ Quantized model written to: {model_path}")
+        print("💡 Set USE_ONNX_EMBEDDINGS = True in src/config.py to use it")
+        return True
+
+    except ImportError as e:
+        print(f"❌ Missing export dependency: {e}")
+        print("💡 Install with: pip install \"optimum[onnxruntime]\"")
+        return False
+    except Exception as e:
+        print(f"❌ Export failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
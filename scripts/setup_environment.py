@@ -9,6 +9,7 @@ This script helps set up your local development environment
 import os
 import sys
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 def create_directory_structure():
@@ -36,14 +37,21 @@ def check_chroma_database():
     
     data_dir = Path("data/chroma_db")
     
-    if data_dir.exists() and any(data_dir.iterdir()):
+    # Single scandir pass - entry count and file sizes come from the same listing
+    db_files = 0
+    total_size = 0
+    if data_dir.exists():
+        with os.scandir(data_dir) as entries:
+            for entry in entries:
+                db_files += 1
+                if entry.is_file(follow_symlinks=False):
+                    total_size += entry.stat(follow_symlinks=False).st_size
+    
+    if db_files:
         print("   ✅ Chroma database found!")
         
         # Show database info
-        db_files = list(data_dir.glob("*"))
-        total_size = sum(f.stat().st_size for f in db_files if f.is_file())
-        
-        print(f"   📊 Files: {len(db_files)}")
+        print(f"   📊 Files: {db_files}")
         print(f"   💾 Size: {round(total_size / (1024 * 1024), 2)} MB")
         return True
     else:
@@ -90,18 +98,30 @@ def check_dependencies():
         "chromadb", 
         "gradio",
         "sentence_transformers",
-        "requests",
+        "httpx",
         "python-dotenv"
     ]
     
-    missing_packages = []
-    
-    for package in required_packages:
+    def import_error(package):
+        """Return None if the package imports, otherwise why it does not"""
         try:
             __import__(package.replace("-", "_"))
-            print(f"   ✅ {package}")
+            return None
         except ImportError:
-            print(f"   ❌ {package} - MISSING")
+            return "MISSING"
+        except Exception as e:
+            return f"BROKEN ({type(e).__name__}: {e})"
+    
+    with ThreadPoolExecutor(max_workers=len(required_packages)) as executor:
+        errors = list(executor.map(import_error, required_packages))
+    
+    missing_packages = []
+    
+    for package, error in zip(required_packages, errors):
+        if error is None:
+            print(f"   ✅ {package}")
+        else:
+            print(f"   ❌ {package} - {error}")
             missing_packages.append(package)
     
     if missing_packages:
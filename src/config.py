@@ -1,81 +1,145 @@
 # src/config.py - Configuration settings for Harry Potter RAG System
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+_BASE_DIR = Path(__file__).parent.parent
+_CHROMA_DB_PATH = _BASE_DIR / "data" / "chroma_db"
+
+@lru_cache(maxsize=1)
+def _scan_database(db_path: str, mtime_ns: int):
+    """Count entries and sum file sizes in one scandir pass.
+    
+    mtime_ns is only part of the cache key, so the scan reruns when the
+    directory changes but is otherwise done once per process.
+    """
+    entries = 0
+    total_size = 0
+    with os.scandir(db_path) as it:
+        for entry in it:
+            entries += 1
+            if entry.is_file(follow_symlinks=False):
+                total_size += entry.stat(follow_symlinks=False).st_size
+    return entries, total_size
+
+@dataclass(frozen=True)
 class Config:
     """Configuration class for Harry Potter RAG System"""
     
     # Project paths
-    BASE_DIR = Path(__file__).parent.parent
-    DATA_DIR = BASE_DIR / "data"
-    CHROMA_DB_PATH = DATA_DIR / "chroma_db"
+    BASE_DIR: Path = _BASE_DIR
+    DATA_DIR: Path = _BASE_DIR / "data"
+    CHROMA_DB_PATH: Path = _CHROMA_DB_PATH
+    CHROMA_DB_PATH_STR: str = str(_CHROMA_DB_PATH)
     
     # API Configuration
-    GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
+    GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
     
     # Model Configuration
-    EMBEDDING_MODEL = "all-MiniLM-L6-v2"
-    DEFAULT_LLM_MODEL = "llama-3.1-8b-instant"
-    FALLBACK_MODELS = [
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    ONNX_EMBEDDING_DIR: Path = _BASE_DIR / "data" / "onnx" / "all-MiniLM-L6-v2-int8"
+    USE_ONNX_EMBEDDINGS: bool = False  # Requires the export from scripts/export_onnx_embeddings.py
+    EMBEDDING_THREADS: int = 1  # Intra-op threads per embedding call; Gradio runs several handlers at once
+    DEFAULT_LLM_MODEL: str = "llama-3.1-8b-instant"
+    FALLBACK_MODELS: Tuple[str, ...] = (
         "mixtral-8x7b-32768",
         "llama3-8b-8192", 
         "llama2-70b-4096"
-    ]
+    )
     
     # RAG Configuration
-    RETRIEVAL_K = 5
-    SCORE_THRESHOLD = 0.3
+    RETRIEVAL_K: int = 5
+    SCORE_THRESHOLD: float = 0.3
+    DEDUP_FETCH_MULTIPLIER: int = 2  # Candidates fetched per context passage kept
+    MINHASH_NUM_PERM: int = 64
+    MINHASH_THRESHOLD: float = 0.7  # Estimated Jaccard similarity treated as duplicate
+    MINHASH_SHINGLE_SIZE: int = 5  # Characters per shingle
+    RAG_WORKER_THREADS: int = 4  # Threads for embedding / vector search in the async pipeline
+    EMBED_BATCH_SIZE: int = 16  # Most concurrent queries embedded in one forward pass
+    EMBED_BATCH_WINDOW: float = 0.0  # Seconds to wait for more queries; 0 batches only overlapping calls
     
     # API Configuration
-    MAX_TOKENS = 1500
-    TEMPERATURE = 0.7
-    TOP_P = 0.9
-    REQUEST_TIMEOUT = 45
-    MAX_RETRIES = 3
+    MAX_TOKENS: int = 1500
+    TEMPERATURE: float = 0.7
+    TOP_P: float = 0.9
+    REQUEST_TIMEOUT: int = 45
+    MAX_RETRIES: int = 3
+    MAX_RETRY_WAIT: int = 10  # Upper bound in seconds for rate-limit waits
+    HEDGE_DELAY: int = 2  # Seconds before chat_async races a fallback model
+    HTTP_POOL_SIZE: int = 20  # Pooled Groq connections, at least GRADIO_MAX_THREADS
+    
+    # Response Cache Configuration
+    RESPONSE_CACHE_SIZE: int = 256
+    RESPONSE_CACHE_TTL: int = 3600  # Seconds
+    RESPONSE_CACHE_MAX_TEMPERATURE: float = 0.2  # Higher temperatures are never cached
+    
+    # RAG Answer Cache Configuration
+    LLM_CACHE_SIZE: int = 512
+    LLM_CACHE_PERSIST: bool = True
+    LLM_CACHE_PATH: Path = _BASE_DIR / "data" / "llm_cache.sqlite3"
+    LLM_CACHE_MAX_ROWS: int = 10000  # Oldest persisted answers are pruned beyond this
+    LLM_CACHE_TTL: int = 7 * 24 * 3600  # Seconds - persisted answers outlive restarts, not the book database
+    
+    # Semantic Cache Configuration (paraphrased queries reuse answers)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_PATH_STR: str = str(_BASE_DIR / "data" / "semantic_cache")
+    SEMANTIC_CACHE_COLLECTION: str = "semantic_cache"
+    SEMANTIC_CACHE_MAX_DISTANCE: float = 0.05  # Cosine distance, i.e. similarity >= 0.95
     
     # UI Configuration
-    GRADIO_PORT = 7860
-    GRADIO_HOST = "127.0.0.1"
-    SHARE_LINK = False
-    DEBUG_MODE = True
+    GRADIO_PORT: int = 7860
+    GRADIO_HOST: str = "127.0.0.1"
+    GRADIO_MAX_THREADS: int = 10  # Upper bound on concurrent Groq requests from the UI
+    UI_CACHE_SIZE: int = 128  # Finished answers kept per interface, keyed by normalized query
+    SHARE_LINK: bool = False
+    DEBUG_MODE: bool = True
     
     # Chroma Configuration
-    COLLECTION_NAME = "langchain"
+    COLLECTION_NAME: str = "langchain"
     
-    @classmethod
-    def validate_config(cls):
+    # Vector Store Backend ("chroma" or "faiss")
+    VECTOR_BACKEND: str = "chroma"  # "faiss" requires scripts/build_faiss_index.py
+    FAISS_INDEX_PATH: Path = _BASE_DIR / "data" / "faiss" / "harry_potter.faiss"
+    FAISS_DOCSTORE_PATH: Path = _BASE_DIR / "data" / "faiss" / "docstore.sqlite3"
+    FAISS_HNSW_M: int = 32  # Graph neighbours per node
+    FAISS_EF_CONSTRUCTION: int = 200
+    FAISS_EF_SEARCH: int = 64  # Search breadth, trades recall for latency
+    
+    def validate_config(self):
         """Validate configuration settings"""
         errors = []
         
         # Check if Chroma DB exists
-        if not cls.CHROMA_DB_PATH.exists():
-            errors.append(f"Chroma database not found at: {cls.CHROMA_DB_PATH}")
+        if not self.CHROMA_DB_PATH.exists():
+            errors.append(f"Chroma database not found at: {self.CHROMA_DB_PATH}")
         
         # Check API key
-        if not cls.GROQ_API_KEY:
+        if not self.GROQ_API_KEY:
             errors.append("GROQ_API_KEY not set in environment variables")
         
         # Create directories if they don't exist
-        cls.DATA_DIR.mkdir(exist_ok=True)
+        self.DATA_DIR.mkdir(exist_ok=True)
         
         return errors
     
-    @classmethod
-    def get_database_info(cls):
+    def get_database_info(self):
         """Get information about the existing database"""
-        if not cls.CHROMA_DB_PATH.exists():
+        try:
+            mtime_ns = os.stat(self.CHROMA_DB_PATH_STR).st_mtime_ns
+        except FileNotFoundError:
             return None
-            
-        db_files = list(cls.CHROMA_DB_PATH.glob("*"))
-        total_size = sum(f.stat().st_size for f in db_files if f.is_file())
+        
+        files, total_size = _scan_database(self.CHROMA_DB_PATH_STR, mtime_ns)
         
         return {
-            "path": str(cls.CHROMA_DB_PATH),
-            "files": len(db_files),
+            "path": self.CHROMA_DB_PATH_STR,
+            "files": files,
             "size_mb": round(total_size / (1024 * 1024), 2),
             "exists": True
         }
@@ -0,0 +1,101 @@
+# src/faiss_store.py - Read-only FAISS vector store for Harry Potter RAG System
+
+"""
+Serves the book passages from a FAISS IndexHNSWFlat instead of Chroma.
+
+The index and its SQLite docstore are built offline from the Chroma
+collection with `python scripts/build_faiss_index.py`. Row i of the docstore
+holds the passage stored at position i of the index.
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+class FaissVectorStore(VectorStore):
+    """LangChain vector store over a memory-mapped FAISS HNSW index"""
+
+    def __init__(self, index, docstore_path, embedding_function: Embeddings):
+        self.index = index
+        self.embedding_function = embedding_function
+        self._db = sqlite3.connect(str(docstore_path), check_same_thread=False)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, index_path, docstore_path, embedding_function: Embeddings, ef_search: int = 64):
+        """Open a prebuilt index, memory-mapping it where FAISS supports it"""
+        import faiss
+
+        if not Path(index_path).is_file() or not Path(docstore_path).is_file():
+            raise FileNotFoundError(
+                f"FAISS index not found at: {index_path} - run scripts/build_faiss_index.py first"
+            )
+
+        try:
+            index = faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # Not every index type can be mapped - fall back to a regular load
+            index = faiss.read_index(str(index_path))
+
+        index.hnsw.efSearch = ef_search
+        return cls(index, docstore_path, embedding_function)
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding_function
+
+    def count(self) -> int:
+        """Number of indexed passages"""
+        return self.index.ntotal
+
+    def _fetch_documents(self, positions: List[int]) -> List[Document]:
+        """Load passages for index positions, keeping the search order"""
+        if not positions:
+            return []
+
+        placeholders = ",".join("?" * len(positions))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT position, document, metadata FROM documents WHERE position IN ({placeholders})",
+                positions
+            ).fetchall()
+
+        by_position = {
+            position: Document(page_content=document, metadata=json.loads(metadata) if metadata else {})
+            for position, document, metadata in rows
+        }
+        return [by_position[position] for position in positions if position in by_position]
+
+    def similarity_search_by_vector_with_scores(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        """Return the k nearest passages with their squared L2 distances"""
+        import numpy as np
+
+        query = np.asarray([embedding], dtype=np.float32)
+        distances, positions = self.index.search(query, k)
+
+        # FAISS pads missing neighbours with -1
+        hits = [(int(position), float(distance)) for position, distance in zip(positions[0], distances[0]) if position >= 0]
+        documents = self._fetch_documents([position for position, _ in hits])
+        return list(zip(documents, [distance for _, distance in hits]))
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_by_vector_with_scores(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_scores(self.embedding_function.embed_query(query), k)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("FaissVectorStore is read-only - rebuild it with scripts/build_faiss_index.py")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, **kwargs: Any):
+        raise NotImplementedError("Build the index with scripts/build_faiss_index.py")
@@ -0,0 +1,23 @@
+# src/fast_hash.py - Non-cryptographic hashing for Harry Potter RAG System
+import hashlib
+
+# xxhash is optional - fall back to BLAKE2b from the standard library when it is missing
+try:
+    import xxhash
+
+    def content_digest(data: bytes) -> bytes:
+        """8-byte digest used to spot duplicate passages"""
+        return xxhash.xxh3_64_digest(data)
+
+    def cache_key(text: str) -> str:
+        """128-bit hex key for cached responses"""
+        return xxhash.xxh3_128_hexdigest(text.encode("utf-8"))
+
+except ImportError:
+    def content_digest(data: bytes) -> bytes:
+        """8-byte digest used to spot duplicate passages"""
+        return hashlib.blake2b(data, digest_size=8).digest()
+
+    def cache_key(text: str) -> str:
+        """128-bit hex key for cached responses"""
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
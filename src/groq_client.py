@@ -1,20 +1,140 @@
 # src/groq_client.py - Groq API Client
-import requests
+import asyncio
+from contextlib import closing
+import importlib.util
+import re
+import socket
+import threading
+import weakref
+from urllib.parse import urlparse
+import httpx
 import time
-from typing import List
+from collections import OrderedDict
+from typing import Iterator, List, Optional
 from config import config
+import fast_hash
+
+# orjson is optional - fall back to the standard library when it is missing
+try:
+    import orjson
+    
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+except ImportError:
+    import json
+    
+    def json_dumps(data) -> bytes:
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+    
+    json_loads = json.loads
+
+# System message for Harry Potter context
+SYSTEM_MESSAGE = (
+    "You are a knowledgeable Harry Potter expert and helpful assistant. "
+    "Provide detailed, accurate answers based on the given context. "
+    "Reference specific books, characters, or events when possible. "
+    "Maintain a warm, knowledgeable tone while being precise and informative."
+)
+
+# Matches Groq reset durations such as "6ms", "7.66s" or "2m59.56s"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+UNAVAILABLE_MESSAGE = "🚫 All language models are currently unavailable. Please try again later."
+
+class StreamInterruptedError(Exception):
+    """A streamed answer stopped before the model finished it"""
 
 class GroqClient:
     """Groq API client with fallback models and retry logic"""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, pool_size: int = None):
         self.api_key = api_key or config.GROQ_API_KEY
         self.base_url = "https://api.groq.com/openai/v1/chat/completions"
+        self.models_url = "https://api.groq.com/openai/v1/models"
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
-        self.models = [config.DEFAULT_LLM_MODEL] + config.FALLBACK_MODELS
+        self.models = [config.DEFAULT_LLM_MODEL, *config.FALLBACK_MODELS]
+        
+        # One pooled client keeps TLS connections alive across retries and chats,
+        # multiplexing concurrent UI requests over HTTP/2 when h2 is installed
+        self.pool_size = pool_size or config.HTTP_POOL_SIZE
+        self.http2 = importlib.util.find_spec("h2") is not None
+        self.http = httpx.Client(
+            http2=self.http2,
+            headers=self.headers,
+            timeout=config.REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=self.pool_size, max_connections=self.pool_size)
+        )
+        
+        # Async HTTP/2 clients for hedged requests, one per event loop - pooled
+        # connections belong to the loop that opened them
+        self._async_clients = weakref.WeakKeyDictionary()
+        
+        # LRU response cache: key -> (timestamp, response)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def _build_messages(self, prompt: str) -> List[dict]:
+        """Wrap the user prompt with the Harry Potter system message"""
+        return [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ]
+    
+    @staticmethod
+    def _retry_delay(response, retry: int) -> float:
+        """Seconds to wait before retrying, preferring the server's rate-limit headers"""
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), config.MAX_RETRY_WAIT)
+            except ValueError:
+                pass
+        
+        reset = response.headers.get("x-ratelimit-reset-tokens") or response.headers.get("x-ratelimit-reset-requests")
+        if reset:
+            parts = _DURATION_PART.findall(reset)
+            if parts:
+                seconds = sum(float(value) * _DURATION_UNITS[unit] for value, unit in parts)
+                return min(seconds, config.MAX_RETRY_WAIT)
+        
+        return min(2 ** retry, config.MAX_RETRY_WAIT)  # Exponential backoff
+    
+    def _cache_key(self, models: List[str], prompt: str, max_tokens: int, temperature: float) -> str:
+        """Hash the request parameters that determine the response"""
+        raw = f"{'|'.join(models)}|{max_tokens}|{temperature}|{prompt}"
+        return fast_hash.cache_key(raw)
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """Return a fresh cached response, evicting it if expired"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            
+            timestamp, response = entry
+            if time.monotonic() - timestamp > config.RESPONSE_CACHE_TTL:
+                del self._cache[key]
+                return None
+            
+            self._cache.move_to_end(key)
+            return response
+    
+    def _cache_put(self, key: str, response: str):
+        """Store a response, dropping the least recently used entries"""
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), response)
+            self._cache.move_to_end(key)
+            while len(self._cache) > config.RESPONSE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+    
+    def clear_cache(self):
+        """Drop all cached responses"""
+        with self._cache_lock:
+            self._cache.clear()
     
     def chat(
         self, 
@@ -23,74 +143,88 @@ class GroqClient:
         max_tokens: int = None,
         temperature: float = None
     ) -> str:
-        """Send a chat request to Groq API with fallback support"""
+        """Send a chat request to Groq API with fallback support
         
-        # Use provided model or default
-        models_to_try = [model] if model else self.models
+        Collects chat_stream() so both share one retry and fallback loop. An
+        answer that is cut off part-way is reported as unavailable rather than
+        returned incomplete.
+        """
+        try:
+            return "".join(self.chat_stream(prompt, model, max_tokens, temperature))
+        except StreamInterruptedError:
+            return UNAVAILABLE_MESSAGE
+    
+    def _iter_stream_content(self, response) -> Iterator[str]:
+        """Yield the content deltas of a server-sent events completion
         
-        # Default parameters
-        max_tokens = max_tokens or config.MAX_TOKENS
-        temperature = temperature or config.TEMPERATURE
+        Raises StreamInterruptedError if the stream ends without [DONE] or a finish_reason.
+        """
+        finished = False
+        for line in response.iter_lines():
+            if not line.startswith("data:"):
+                continue
+            
+            data = line[5:].strip()
+            if data == "[DONE]":
+                finished = True
+                break
+            
+            choice = json_loads(data)["choices"][0]
+            content = choice.get("delta", {}).get("content")
+            if content:
+                yield content
+            if choice.get("finish_reason"):
+                finished = True
         
-        # System message for Harry Potter context
-        system_message = (
-            "You are a knowledgeable Harry Potter expert and helpful assistant. "
-            "Provide detailed, accurate answers based on the given context. "
-            "Reference specific books, characters, or events when possible. "
-            "Maintain a warm, knowledgeable tone while being precise and informative."
-        )
+        if not finished:
+            raise StreamInterruptedError("stream ended before the answer was complete")
+    
+    def chat_stream(
+        self, 
+        prompt: str, 
+        model: str = None,
+        max_tokens: int = None,
+        temperature: float = None
+    ) -> Iterator[str]:
+        """Stream a chat response from Groq API as it is generated
         
-        # Prepare messages
-        messages = [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": prompt}
-        ]
+        Retries and fallback models are only used until the first token
+        arrives - once text has been yielded it cannot be taken back, so a
+        later failure raises StreamInterruptedError instead.
+        """
+        
+        models_to_try = [model] if model else self.models
+        max_tokens = max_tokens if max_tokens is not None else config.MAX_TOKENS
+        temperature = temperature if temperature is not None else config.TEMPERATURE
+        
+        cache_key = None
+        if temperature <= config.RESPONSE_CACHE_MAX_TEMPERATURE:
+            cache_key = self._cache_key(models_to_try, prompt, max_tokens, temperature)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        messages = self._build_messages(prompt)
         
-        # Try each model with retry logic
         for attempt, current_model in enumerate(models_to_try):
             for retry in range(config.MAX_RETRIES):
+                payload = {
+                    "model": current_model,
+                    "messages": messages,
+                    "max_tokens": max_tokens,
+                    "temperature": temperature,
+                    "top_p": config.TOP_P,
+                    "stream": True
+                }
+                
                 try:
-                    payload = {
-                        "model": current_model,
-                        "messages": messages,
-                        "max_tokens": max_tokens,
-                        "temperature": temperature,
-                        "top_p": config.TOP_P
-                    }
-                    
-                    response = requests.post(
-                        self.base_url,
-                        headers=self.headers,
-                        json=payload,
-                        timeout=config.REQUEST_TIMEOUT
+                    response = self.http.send(
+                        self.http.build_request("POST", self.base_url, content=json_dumps(payload)),
+                        stream=True
                     )
-                    
-                    # Success case
-                    if response.status_code == 200:
-                        result = response.json()["choices"][0]["message"]["content"]
-                        if attempt > 0:
-                            print(f"🔄 Used fallback model: {current_model}")
-                        return result
-                    
-                    # Rate limit case
-                    elif response.status_code == 429:
-                        wait_time = 2 ** retry  # Exponential backoff
-                        print(f"⏳ Rate limited, waiting {wait_time}s before retry...")
-                        time.sleep(wait_time)
-                        if retry == config.MAX_RETRIES - 1:
-                            break
-                        continue
-                    
-                    # Other API errors
-                    else:
-                        if retry == config.MAX_RETRIES - 1:
-                            print(f"⚠️ API Error {response.status_code} with {current_model}")
-                            if attempt < len(models_to_try) - 1:
-                                print(f"🔄 Trying fallback model...")
-                            break
-                        continue
                 
-                except requests.exceptions.Timeout:
+                except httpx.TimeoutException:
                     if retry == config.MAX_RETRIES - 1:
                         print(f"⏰ Timeout with {current_model}")
                         if attempt < len(models_to_try) - 1:
@@ -107,23 +241,173 @@ class GroqClient:
                         break
                     time.sleep(1)
                     continue
+                
+                with closing(response):
+                    # Success case - stream until the server signals completion
+                    if response.status_code == 200:
+                        if attempt > 0:
+                            print(f"🔄 Used fallback model: {current_model}")
+                        
+                        parts = []
+                        try:
+                            for content in self._iter_stream_content(response):
+                                parts.append(content)
+                                yield content
+                        except Exception as e:
+                            print(f"❌ Stream interrupted with {current_model}: {str(e)}")
+                            if not parts:
+                                if attempt < len(models_to_try) - 1:
+                                    print(f"🔄 Trying fallback model...")
+                                break
+                            raise StreamInterruptedError(str(e)) from e
+                        
+                        if cache_key is not None and parts:
+                            self._cache_put(cache_key, "".join(parts))
+                        return
+                    
+                    # Rate limit / overloaded case
+                    if response.status_code in (429, 503):
+                        wait_time = self._retry_delay(response, retry)
+                        print(f"⏳ Rate limited, waiting {wait_time:.2f}s before retry...")
+                        time.sleep(wait_time)
+                        continue
+                    
+                    # Other API errors
+                    if retry == config.MAX_RETRIES - 1:
+                        print(f"⚠️ API Error {response.status_code} with {current_model}")
+                        if attempt < len(models_to_try) - 1:
+                            print(f"🔄 Trying fallback model...")
+                        break
         
         # All models failed
-        return "🚫 All language models are currently unavailable. Please try again later."
+        yield UNAVAILABLE_MESSAGE
     
-    def test_connection(self) -> dict:
-        """Test the Groq API connection"""
-        try:
-            test_response = self.chat(
-                "Hello, this is a test message. Please respond with 'Test successful!'",
-                max_tokens=50
+    def _get_async_client(self):
+        """Return the running loop's httpx.AsyncClient, creating it on first use (HTTP/2 when h2 is installed)"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                headers=self.headers,
+                timeout=config.REQUEST_TIMEOUT,
+                limits=httpx.Limits(max_keepalive_connections=self.pool_size, max_connections=self.pool_size)
             )
+            self._async_clients[loop] = client
+        return client
+    
+    async def aclose(self):
+        """Close the running loop's async client - call before the loop shuts down"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+    
+    async def _post_async(self, model: str, messages: List[dict], max_tokens: int, temperature: float) -> str:
+        """Send a single chat completion request and return the message content"""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": config.TOP_P
+        }
+        
+        response = await self._get_async_client().post(self.base_url, content=json_dumps(payload))
+        response.raise_for_status()
+        return json_loads(response.content)["choices"][0]["message"]["content"]
+    
+    async def chat_async(
+        self, 
+        prompt: str, 
+        model: str = None,
+        max_tokens: int = None,
+        temperature: float = None
+    ) -> str:
+        """Send a hedged chat request - a fallback model is raced in whenever
+        the current request takes longer than HEDGE_DELAY seconds"""
+        
+        models_to_try = [model] if model else self.models
+        max_tokens = max_tokens if max_tokens is not None else config.MAX_TOKENS
+        temperature = temperature if temperature is not None else config.TEMPERATURE
+        
+        # Same cache as chat() - only near-deterministic generations are reused
+        cache_key = None
+        if temperature <= config.RESPONSE_CACHE_MAX_TEMPERATURE:
+            cache_key = self._cache_key(models_to_try, prompt, max_tokens, temperature)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+        
+        messages = self._build_messages(prompt)
+        
+        pending = set()
+        remaining = list(models_to_try)
+        
+        try:
+            while remaining or pending:
+                if remaining:
+                    current_model = remaining.pop(0)
+                    pending.add(asyncio.create_task(
+                        self._post_async(current_model, messages, max_tokens, temperature),
+                        name=current_model
+                    ))
+                
+                # Wait for the hedge delay before racing the next model in
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=config.HEDGE_DELAY if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                for task in done:
+                    if task.exception() is None:
+                        if task.get_name() != models_to_try[0]:
+                            print(f"🔄 Used fallback model: {task.get_name()}")
+                        result = task.result()
+                        if cache_key is not None:
+                            self._cache_put(cache_key, result)
+                        return result
+                    print(f"⚠️ Error with {task.get_name()}: {task.exception()}")
+        finally:
+            # Cancel the losers of the race
+            for task in pending:
+                task.cancel()
+        
+        return UNAVAILABLE_MESSAGE
+    
+    def test_connection(self, full_chat: bool = False) -> dict:
+        """Test the Groq API connection
+        
+        By default this only lists the available models, which validates the
+        API key without spending any tokens. Pass full_chat=True to run a real
+        chat round-trip instead.
+        """
+        try:
+            if full_chat:
+                test_response = self.chat(
+                    "Hello, this is a test message. Please respond with 'Test successful!'",
+                    max_tokens=50
+                )
+                
+                return {
+                    "status": "success",
+                    "message": "Connection successful",
+                    "response": test_response,
+                    "api_key_valid": True
+                }
+            
+            response = self.http.get(self.models_url, timeout=5)
+            if response.status_code == 200:
+                return {
+                    "status": "success",
+                    "message": "Connection successful",
+                    "api_key_valid": True
+                }
             
             return {
-                "status": "success",
-                "message": "Connection successful",
-                "response": test_response,
-                "api_key_valid": True
+                "status": "error",
+                "message": f"Connection failed: HTTP {response.status_code} {response.text[:200]}",
+                "api_key_valid": response.status_code not in (401, 403)
             }
             
         except Exception as e:
@@ -133,9 +417,22 @@ class GroqClient:
                 "api_key_valid": False
             }
     
+    def warm_up(self):
+        """Resolve DNS and open a pooled TLS connection ahead of the first chat"""
+        try:
+            socket.getaddrinfo(urlparse(self.base_url).hostname, 443)
+            self.http.head(self.base_url)
+        except Exception:
+            # Best effort only - the first real request will connect normally
+            pass
+    
     def get_available_models(self) -> List[str]:
         """Get list of available models"""
         return self.models.copy()
 
 # Create a global client instance
-groq_client = GroqClient()
\ No newline at end of file
+groq_client = GroqClient()
+
+# Warm the connection in the background so the first chat starts hot
+if config.GROQ_API_KEY:
+    threading.Thread(target=groq_client.warm_up, daemon=True).start()
\ No newline at end of file
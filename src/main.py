@@ -6,8 +6,12 @@ from pathlib import Path
 # Add src directory to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
+# Gradio serves requests from several threads at once - one BLAS/OpenMP thread
+# each avoids oversubscribing the cores. Must be set before torch is imported
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
 from config import config
-from rag_pipeline import harry_potter_rag
 from groq_client import groq_client
 from ui_components import HarryPotterUI
 
@@ -50,6 +54,9 @@ def validate_environment():
 
 def initialize_system():
     """Initialize the RAG system"""
+    # Imported here so a failed environment check never pays for torch/chromadb
+    from rag_pipeline import harry_potter_rag
+    
     print("\n🏰 Initializing Harry Potter RAG System...")
     print("=" * 50)
     
@@ -58,6 +65,19 @@ def initialize_system():
         print("❌ Failed to initialize RAG system")
         return False
     
+    # One intra-op thread per concurrent handler, matching OMP_NUM_THREADS above
+    try:
+        import torch
+        torch.set_num_threads(config.EMBEDDING_THREADS)
+    except ImportError:
+        pass
+    
+    # Pay the cold-start cost now rather than on the first user query - this is
+    # also the only retrieval run at startup when the collection count is known
+    if not harry_potter_rag.warmup():
+        print("❌ Startup retrieval failed - the vector store is not answering queries")
+        return False
+    
     # Get system stats
     stats = harry_potter_rag.get_system_stats()
     if stats["status"] == "ready":
@@ -65,6 +85,8 @@ def initialize_system():
         print(f"   🎯 Status: {stats['status'].title()}")
         print(f"   🧠 Embedding Model: {stats['embedding_model']}")
         print(f"   💎 Collection: {stats['collection_name']}")
+        if stats['collection_count'] is not None:
+            print(f"   📖 Collection Documents: {stats['collection_count']}")
         print(f"   📚 Test Documents: {stats['test_documents_found']}")
         print(f"   🔍 Retrieval K: {stats['retrieval_k']}")
         print(f"   ⚡ Functional: {'Yes' if stats['is_functional'] else 'No'}")
@@ -79,6 +101,8 @@ def initialize_system():
 
 def create_interface():
     """Create and configure the UI interface"""
+    from rag_pipeline import harry_potter_rag
+    
     print("\n🎨 Creating Magical User Interface...")
     print("=" * 50)
     
@@ -87,7 +111,7 @@ def create_interface():
         ui = HarryPotterUI()
         
         # Create interface with RAG pipeline
-        interface = ui.create_interface(harry_potter_rag.generate_response)
+        interface = ui.create_interface(harry_potter_rag.generate_response_stream)
         
         print("✅ UI created successfully!")
         return interface
@@ -121,7 +145,7 @@ def launch_application():
             share=config.SHARE_LINK,
             debug=config.DEBUG_MODE,
             show_error=True,
-            max_threads=10,
+            max_threads=config.GRADIO_MAX_THREADS,
             favicon_path=None
         )
         
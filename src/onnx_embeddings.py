@@ -0,0 +1,97 @@
+# src/onnx_embeddings.py - ONNX Runtime embeddings for Harry Potter RAG System
+
+"""
+Sentence embeddings served by ONNX Runtime instead of PyTorch.
+
+Expects a directory holding an int8 quantized export of the embedding model
+(model_quantized.onnx or model.onnx) next to its fast tokenizer (tokenizer.json).
+Requires the optional `onnxruntime` and `tokenizers` packages. Build the export
+with `python scripts/export_onnx_embeddings.py`.
+"""
+
+import os
+from pathlib import Path
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+MAX_SEQUENCE_LENGTH = 256
+
+def onnx_runtime_available() -> bool:
+    """Check whether the optional ONNX Runtime dependencies are installed"""
+    try:
+        import onnxruntime  # noqa: F401
+        import tokenizers  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def find_onnx_model(model_dir) -> Optional[Path]:
+    """Return the quantized model file inside model_dir, or None if missing"""
+    model_dir = Path(model_dir)
+    for name in ("model_quantized.onnx", "model.onnx"):
+        model_path = model_dir / name
+        if model_path.is_file() and (model_dir / "tokenizer.json").is_file():
+            return model_path
+    return None
+
+class OnnxEmbeddings(Embeddings):
+    """LangChain embeddings backed by an ONNX Runtime CPU session"""
+
+    def __init__(self, model_dir, normalize_embeddings: bool = True, num_threads: int = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = find_onnx_model(model_dir)
+        if model_path is None:
+            raise FileNotFoundError(f"No ONNX model with tokenizer.json found in: {model_dir}")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = num_threads or os.cpu_count() or 1
+
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(Path(model_dir) / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQUENCE_LENGTH)
+        self.tokenizer.enable_padding()
+
+        self.normalize_embeddings = normalize_embeddings
+
+    def _encode(self, texts: List[str]):
+        """Tokenize a batch, run the encoder and mean-pool the token states"""
+        import numpy as np
+
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_states = self.session.run(None, inputs)[0]
+
+        # Mean pooling over real (non-padding) tokens, as sentence-transformers does
+        mask = attention_mask[..., None].astype(token_states.dtype)
+        embeddings = (token_states * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+        return embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of documents in a single forward pass"""
+        if not texts:
+            return []
+        return self._encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query"""
+        return self._encode([text])[0].tolist()
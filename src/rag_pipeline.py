@@ -1,58 +1,291 @@
 # src/rag_pipeline.py - RAG Pipeline for Harry Potter Knowledge System
 
-# Updated imports with proper fallback handling
-try:
-    # Try newer langchain-huggingface first (most recommended)
-    from langchain_huggingface import HuggingFaceEmbeddings
-    print("✅ Using langchain_huggingface")
-except ImportError:
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterator, Tuple, Optional
+import asyncio
+import os
+import re
+import threading
+import time
+import uuid
+from config import config
+from fast_hash import content_digest
+from groq_client import StreamInterruptedError, groq_client
+from response_cache import ResponseCache
+
+# Heavy langchain/torch imports are deferred until the pipeline is initialized
+HuggingFaceEmbeddings = None
+Chroma = None
+
+def _lazy_imports():
+    """Import the embedding and vector store classes on first use"""
+    global HuggingFaceEmbeddings, Chroma
+    if HuggingFaceEmbeddings is not None and Chroma is not None:
+        return
+    
+    # Updated imports with proper fallback handling
     try:
-        # Fallback to langchain-community
-        from langchain_community.embeddings import HuggingFaceEmbeddings
-        print("✅ Using langchain_community.embeddings")
+        # Try newer langchain-huggingface first (most recommended)
+        from langchain_huggingface import HuggingFaceEmbeddings
+        print("✅ Using langchain_huggingface")
     except ImportError:
         try:
-            # Final fallback to older langchain
-            from langchain.embeddings import HuggingFaceEmbeddings
-            print("✅ Using langchain.embeddings")
-        except ImportError as e:
-            print(f"❌ HuggingFaceEmbeddings import error: {e}")
-            print("💡 Try: pip install --upgrade langchain langchain-community sentence-transformers")
-            raise
+            # Fallback to langchain-community
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            print("✅ Using langchain_community.embeddings")
+        except ImportError:
+            try:
+                # Final fallback to older langchain
+                from langchain.embeddings import HuggingFaceEmbeddings
+                print("✅ Using langchain.embeddings")
+            except ImportError as e:
+                print(f"❌ HuggingFaceEmbeddings import error: {e}")
+                print("💡 Try: pip install --upgrade langchain langchain-community sentence-transformers")
+                raise
 
-try:
-    # Try langchain-chroma first (recommended)
-    from langchain_chroma import Chroma
-    print("✅ Using langchain_chroma")
-except ImportError:
     try:
-        # Fallback to langchain-community
-        from langchain_community.vectorstores import Chroma
-        print("✅ Using langchain_community.vectorstores")
+        # Try langchain-chroma first (recommended)
+        from langchain_chroma import Chroma
+        print("✅ Using langchain_chroma")
     except ImportError:
         try:
-            # Final fallback to older langchain
-            from langchain.vectorstores import Chroma
-            print("✅ Using langchain.vectorstores")
-        except ImportError as e:
-            print(f"❌ Chroma import error: {e}")
-            print("💡 Try: pip install --upgrade langchain langchain-chroma chromadb")
-            raise
+            # Fallback to langchain-community
+            from langchain_community.vectorstores import Chroma
+            print("✅ Using langchain_community.vectorstores")
+        except ImportError:
+            try:
+                # Final fallback to older langchain
+                from langchain.vectorstores import Chroma
+                print("✅ Using langchain.vectorstores")
+            except ImportError as e:
+                print(f"❌ Chroma import error: {e}")
+                print("💡 Try: pip install --upgrade langchain langchain-chroma chromadb")
+                raise
 
-from typing import List, Dict, Any
-import os
-from config import config
-from groq_client import groq_client
+# Query classification rules in priority order: (query type, k_docs, keywords)
+QUERY_TYPES = (
+    ("character_analysis", 4, ("who is", "tell me about", "describe", "character")),
+    ("plot_summary", 6, ("summarize", "summary", "what happens", "events", "plot")),
+    ("detail_query", 3, ("how", "why", "what", "where", "when", "trivia")),
+    ("comparison", 5, ("compare", "difference", "vs", "versus")),
+)
+QUERY_TYPE_PRIORITY = {query_type: priority for priority, (query_type, _, _) in enumerate(QUERY_TYPES)}
+
+# One pattern over every keyword. The lookahead reports matches at every position,
+# so overlapping keywords are all seen and the highest-priority rule still wins
+_QUERY_PATTERN = re.compile(
+    "(?=" + "|".join(
+        f"(?P<{query_type}>{'|'.join(re.escape(keyword) for keyword in keywords)})"
+        for query_type, _, keywords in QUERY_TYPES
+    ) + ")"
+)
+
+@dataclass(frozen=True)
+class QueryAnalysis:
+    """Retrieval strategy chosen for a query"""
+    type: str
+    k_docs: int
+    complexity: int
+
+# Prompt text shared by every request. It leads the prompt so the provider can
+# reuse its cached prefill, with per-request context and question after it
+PROMPT_PREFIX = """You are an expert on the Harry Potter series with deep knowledge of all seven books. Use the provided context to answer the user's question comprehensively and accurately.
+
+**Instructions:**
+- Reference specific books, characters, or events when relevant
+- If you're not completely certain about something, acknowledge it
+- Keep the magical tone but be informative and accurate
+- Structure your response clearly"""
+
+# Fixed prompt pieces around the per-request context, question and instruction
+_PROMPT_HEAD = PROMPT_PREFIX + "\n\n**Context from Harry Potter books:**\n"
+_CONTEXT_SEPARATOR = "\n\n---\n\n"
+_PROMPT_QUESTION = "\n\n**User Question:** "
+_PROMPT_FOCUS = "\n\n**Focus:** "
+_PROMPT_TAIL = "\n\n**Answer:**"
+
+# Query-specific instructions
+TYPE_INSTRUCTIONS = {
+    "character_analysis": "Focus on character development, personality traits, relationships, and key moments. Reference specific books when possible.",
+    "plot_summary": "Organize information chronologically and provide a comprehensive overview of events. Include key details and outcomes.",
+    "detail_query": "Be specific and precise with facts. Provide exact details and reference the source material.",
+    "comparison": "Clearly contrast the different elements being compared. Use structured comparisons and specific examples.",
+    "general": "Provide a well-rounded answer that covers all relevant aspects of the topic."
+}
+
+# Replies that end a request before any answer is generated
+EMPTY_QUERY_MESSAGE = "🪄 Please cast a question spell by typing your query!"
+NOT_INITIALIZED_MESSAGE = "🚨 RAG system not initialized. Please check the setup."
+NO_CONTEXT_MESSAGE = "🔍 I couldn't find relevant information in the Harry Potter books for your query. Try rephrasing your question or asking about specific characters, events, or magical elements."
+
+# Loaded embedding models keyed by (model_name, device, normalize_embeddings, use_onnx)
+_EMBEDDING_CACHE: Dict[Tuple[str, str, bool, bool], Any] = {}
+
+def _load_onnx_embeddings(normalize: bool):
+    """Load the int8 ONNX export of the embedding model, or None if unavailable"""
+    from onnx_embeddings import OnnxEmbeddings, find_onnx_model, onnx_runtime_available
+    
+    if not onnx_runtime_available():
+        print("⚠️ onnxruntime/tokenizers not installed - using PyTorch embeddings")
+        return None
+    if find_onnx_model(config.ONNX_EMBEDDING_DIR) is None:
+        print(f"⚠️ No ONNX model found in {config.ONNX_EMBEDDING_DIR} - using PyTorch embeddings")
+        return None
+    
+    print("⚡ Using ONNX Runtime int8 embeddings")
+    return OnnxEmbeddings(
+        config.ONNX_EMBEDDING_DIR,
+        normalize_embeddings=normalize,
+        num_threads=config.EMBEDDING_THREADS
+    )
+
+def get_embedding_model(model_name: str = None, device: str = "cpu", normalize: bool = True, use_onnx: bool = None):
+    """Return a shared embedding model, loading the weights only on first use"""
+    model_name = model_name or config.EMBEDDING_MODEL
+    if use_onnx is None:
+        use_onnx = config.USE_ONNX_EMBEDDINGS
+    # The ONNX export only exists for the configured model on CPU
+    use_onnx = use_onnx and model_name == config.EMBEDDING_MODEL and device == "cpu"
+    
+    key = (model_name, device, normalize, use_onnx)
+    if key not in _EMBEDDING_CACHE:
+        embedding_model = _load_onnx_embeddings(normalize) if use_onnx else None
+        
+        if embedding_model is None:
+            _lazy_imports()
+            embedding_model = HuggingFaceEmbeddings(
+                model_name=model_name,
+                model_kwargs={'device': device},
+                encode_kwargs={'normalize_embeddings': normalize}
+            )
+        
+        _EMBEDDING_CACHE[key] = embedding_model
+    return _EMBEDDING_CACHE[key]
+
+class _NearDuplicateIndex:
+    """MinHash-LSH over character shingles of the passages selected so far"""
+    
+    def __init__(self, minhash_cls, lsh_cls):
+        self._minhash_cls = minhash_cls
+        self._lsh = lsh_cls(threshold=config.MINHASH_THRESHOLD, num_perm=config.MINHASH_NUM_PERM)
+    
+    def is_duplicate(self, key: bytes, content: str) -> bool:
+        """Return True if content resembles an indexed passage, otherwise index it"""
+        text = " ".join(content.lower().split())
+        size = config.MINHASH_SHINGLE_SIZE
+        shingles = {text[i:i + size] for i in range(max(len(text) - size + 1, 1))}
+        
+        minhash = self._minhash_cls(num_perm=config.MINHASH_NUM_PERM)
+        minhash.update_batch(shingle.encode("utf-8") for shingle in shingles)
+        
+        if self._lsh.query(minhash):
+            return True
+        self._lsh.insert(key.hex(), minhash)
+        return False
+
+def _new_near_duplicate_index() -> Optional[_NearDuplicateIndex]:
+    """Create a near-duplicate index, or None when datasketch is not installed"""
+    try:
+        from datasketch import MinHash, MinHashLSH
+    except ImportError:
+        return None
+    return _NearDuplicateIndex(MinHash, MinHashLSH)
+
+class _PendingEmbedding:
+    """A queued query, its result and the signal that wakes its caller"""
+    __slots__ = ("text", "future", "wake")
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.future = Future()
+        self.wake = threading.Event()
+
+class _QueryEmbeddingBatcher:
+    """Coalesces concurrent embed_query calls into shared embed_documents batches
+    
+    One caller at a time leads: it embeds queued queries in batches until its
+    own query is done, then hands leadership to the oldest waiter. Other callers
+    sleep until their result arrives or they are promoted, so a lone request
+    pays no extra latency with a zero window.
+    """
+    
+    def __init__(self, embedding_model, max_batch: int, window: float):
+        self._embedding_model = embedding_model
+        self._max_batch = max(1, max_batch)
+        self._window = window
+        self._pending: List[_PendingEmbedding] = []
+        self._lock = threading.Lock()
+        self._leader_active = False
+    
+    def embed(self, text: str) -> List[float]:
+        entry = _PendingEmbedding(text)
+        with self._lock:
+            self._pending.append(entry)
+            is_leader = not self._leader_active
+            self._leader_active = True
+        
+        if is_leader:
+            if self._window > 0:
+                time.sleep(self._window)
+        else:
+            entry.wake.wait()
+        
+        # Woken without a result means this caller was promoted to leader
+        if not entry.future.done():
+            self._lead(entry)
+        
+        return entry.future.result()
+    
+    def _lead(self, entry: _PendingEmbedding):
+        """Embed queued batches until entry is resolved, then pass leadership on"""
+        try:
+            while not entry.future.done():
+                with self._lock:
+                    batch = self._pending[:self._max_batch]
+                    del self._pending[:self._max_batch]
+                self._embed_batch(batch)
+        finally:
+            with self._lock:
+                if self._pending:
+                    self._pending[0].wake.set()
+                else:
+                    self._leader_active = False
+    
+    def _embed_batch(self, batch: List[_PendingEmbedding]):
+        """Resolve every entry of a batch, even when the embedding model raises"""
+        try:
+            if len(batch) == 1:
+                vectors = [self._embedding_model.embed_query(batch[0].text)]
+            else:
+                vectors = self._embedding_model.embed_documents([item.text for item in batch])
+        except BaseException as e:
+            for item in batch:
+                item.future.set_exception(e)
+                item.wake.set()
+            if not isinstance(e, Exception):
+                raise
+            return
+        
+        for item, vector in zip(batch, vectors):
+            item.future.set_result(vector)
+            item.wake.set()
 
 class HarryPotterRAG:
     """RAG pipeline for Harry Potter knowledge retrieval"""
     
     def __init__(self, chroma_db_path: str = None):
-        self.chroma_db_path = chroma_db_path or str(config.CHROMA_DB_PATH)
+        self.chroma_db_path = chroma_db_path or config.CHROMA_DB_PATH_STR
         self.embedding_model = None
         self.vectorstore = None
-        self.retriever = None
+        self.semantic_cache = None
+        self.collection_count = None
+        self.test_documents_found = 0
+        self._embedding_batcher = None
         self.is_initialized = False
+        # Worker threads for blocking embedding / vector search calls in the async path
+        self._pool = ThreadPoolExecutor(max_workers=config.RAG_WORKER_THREADS)
+        self.response_cache = None
         
     def initialize(self) -> bool:
         """Initialize the RAG pipeline components"""
@@ -63,6 +296,9 @@ class HarryPotterRAG:
             if not os.path.exists(self.chroma_db_path):
                 raise FileNotFoundError(f"Chroma database not found at: {self.chroma_db_path}")
             
+            # Load langchain integrations (deferred from module import)
+            _lazy_imports()
+            
             # Test sentence-transformers import explicitly
             print("🔍 Testing sentence-transformers import...")
             try:
@@ -75,36 +311,59 @@ class HarryPotterRAG:
             
             # Initialize embedding model
             print("📥 Loading embedding model...")
-            self.embedding_model = HuggingFaceEmbeddings(
-                model_name=config.EMBEDDING_MODEL,
-                model_kwargs={'device': 'cpu'},
-                encode_kwargs={'normalize_embeddings': True}
+            self.embedding_model = get_embedding_model(config.EMBEDDING_MODEL)
+            self._embedding_batcher = _QueryEmbeddingBatcher(
+                self.embedding_model, config.EMBED_BATCH_SIZE, config.EMBED_BATCH_WINDOW
             )
             
             # Load existing vector store
             print("💎 Loading existing vector database...")
-            self.vectorstore = Chroma(
-                persist_directory=self.chroma_db_path,
-                embedding_function=self.embedding_model,
-                collection_name=config.COLLECTION_NAME
-            )
+            if config.VECTOR_BACKEND == "faiss":
+                from faiss_store import FaissVectorStore
+                self.vectorstore = FaissVectorStore.load(
+                    config.FAISS_INDEX_PATH,
+                    config.FAISS_DOCSTORE_PATH,
+                    self.embedding_model,
+                    ef_search=config.FAISS_EF_SEARCH
+                )
+            else:
+                self.vectorstore = Chroma(
+                    persist_directory=self.chroma_db_path,
+                    embedding_function=self.embedding_model,
+                    collection_name=config.COLLECTION_NAME
+                )
             
-            # Create retriever - REMOVED score_threshold as it's not supported
-            print("🔍 Setting up document retriever...")
-            self.retriever = self.vectorstore.as_retriever(
-                search_type="similarity",
-                search_kwargs={
-                    "k": config.RETRIEVAL_K
-                    # Removed "score_threshold": config.SCORE_THRESHOLD - not supported
-                }
+            # Opened here rather than in __init__ so importing this module touches no files
+            self.response_cache = ResponseCache(
+                max_size=config.LLM_CACHE_SIZE,
+                db_path=config.LLM_CACHE_PATH if config.LLM_CACHE_PERSIST else None,
+                max_rows=config.LLM_CACHE_MAX_ROWS,
+                ttl=config.LLM_CACHE_TTL
             )
             
-            # Test the system - Updated to use invoke() instead of get_relevant_documents()
+            # Semantic answer cache lives in its own directory, never in the book database
+            if config.SEMANTIC_CACHE_ENABLED:
+                try:
+                    self.semantic_cache = Chroma(
+                        persist_directory=config.SEMANTIC_CACHE_PATH_STR,
+                        embedding_function=self.embedding_model,
+                        collection_name=config.SEMANTIC_CACHE_COLLECTION,
+                        collection_metadata={"hnsw:space": "cosine"}
+                    )
+                except Exception as e:
+                    print(f"⚠️ Semantic cache disabled: {e}")
+                    self.semantic_cache = None
+            
+            # Test the system
             print("🧪 Testing retriever...")
             
             # First check collection count
+            collection_count = None
             try:
-                collection_count = self.vectorstore._collection.count()
+                if config.VECTOR_BACKEND == "faiss":
+                    collection_count = self.vectorstore.count()
+                else:
+                    collection_count = self.vectorstore._collection.count()
                 print(f"📊 Collection '{config.COLLECTION_NAME}' contains {collection_count} documents")
                 
                 if collection_count == 0:
@@ -113,35 +372,36 @@ class HarryPotterRAG:
             except Exception as e:
                 print(f"⚠️ Could not check collection count: {e}")
             
-            # Test retrieval
-            try:
-                # Try the new method first
-                test_docs = self.retriever.invoke("Harry Potter")
-            except AttributeError:
-                # Fallback to older method if available
-                test_docs = self.retriever.get_relevant_documents("Harry Potter")
+            self.collection_count = collection_count
             
-            if not test_docs:
-                # Try alternative test queries
-                test_queries = ["magic", "wizard", "Hogwarts", "book"]
-                for query in test_queries:
+            # A populated collection skips the probe retrievals - warmup() runs the
+            # real search path and records test_documents_found from it
+            if not collection_count:
+                # The collection size is unknown - probe with several queries
+                test_queries = ["Harry Potter", "magic", "wizard", "Hogwarts", "book"]
+                
+                # Embed every probe in one forward pass, then search by vector
+                test_docs = []
+                query_vectors = self.embedding_model.embed_documents(test_queries)
+                for query, query_vector in zip(test_queries, query_vectors):
                     try:
-                        if hasattr(self.retriever, 'invoke'):
-                            test_docs = self.retriever.invoke(query)
-                        else:
-                            test_docs = self.retriever.get_relevant_documents(query)
+                        test_docs = self.vectorstore.similarity_search_by_vector(query_vector, k=config.RETRIEVAL_K)
                         if test_docs:
-                            print(f"✅ Found documents with query: '{query}'")
+                            if query != test_queries[0]:
+                                print(f"✅ Found documents with query: '{query}'")
                             break
-                    except:
+                    except Exception:
                         continue
                 
                 if not test_docs:
                     raise ValueError("No documents found with any test query - database might be empty or misconfigured")
+                
+                # Remembered so get_system_stats() doesn't need another retrieval
+                self.test_documents_found = len(test_docs)
+                print(f"📊 Found {self.test_documents_found} test documents")
             
             self.is_initialized = True
             print("✅ RAG System initialized successfully!")
-            print(f"📊 Found {len(test_docs)} test documents")
             
             return True
             
@@ -149,173 +409,357 @@ class HarryPotterRAG:
             print(f"❌ Failed to initialize RAG system: {str(e)}")
             return False
     
-    def analyze_query(self, query: str) -> Dict[str, Any]:
+    def warmup(self) -> bool:
+        """Run the request path once at startup so the first real query isn't cold
+        
+        The first calls pay for model graph setup, tokenizer caches and paging in
+        the vector index, so embedding and search each run twice. The documents
+        found are recorded as test_documents_found.
+        """
+        if not self.is_initialized:
+            return False
+        
+        try:
+            print("🔥 Warming up embedding model and vector index...")
+            for _ in range(2):
+                query_vector = self.embedding_model.embed_query("Harry Potter")
+                test_docs = self.vectorstore.similarity_search_by_vector(
+                    query_vector, k=config.RETRIEVAL_K * config.DEDUP_FETCH_MULTIPLIER
+                )
+            
+            self.test_documents_found = len(test_docs[:config.RETRIEVAL_K])
+            if not test_docs:
+                raise ValueError("Warm-up retrieval returned no documents")
+            
+            if self.semantic_cache is not None:
+                self.lookup_semantic_cache(query_vector)
+            
+            print("✅ Warm-up complete")
+            print(f"📊 Found {self.test_documents_found} test documents")
+            return True
+            
+        except Exception as e:
+            self.test_documents_found = 0
+            print(f"⚠️ Warm-up failed: {e}")
+            return False
+    
+    def analyze_query(self, query: str) -> QueryAnalysis:
         """Analyze query to determine optimal retrieval strategy"""
         query_lower = query.lower()
         
-        # Query type classification
-        if any(phrase in query_lower for phrase in ["who is", "tell me about", "describe", "character"]):
-            query_type = "character_analysis"
-            k_docs = 4
-        elif any(word in query_lower for word in ["summarize", "summary", "what happens", "events", "plot"]):
-            query_type = "plot_summary"
-            k_docs = 6
-        elif any(word in query_lower for word in ["how", "why", "what", "where", "when", "trivia"]):
-            query_type = "detail_query"
-            k_docs = 3
-        elif any(word in query_lower for word in ["compare", "difference", "vs", "versus"]):
-            query_type = "comparison"
-            k_docs = 5
+        # Query type classification - single regex pass, best priority wins
+        priority = len(QUERY_TYPES)
+        for match in _QUERY_PATTERN.finditer(query_lower):
+            priority = min(priority, QUERY_TYPE_PRIORITY[match.lastgroup])
+            if priority == 0:
+                break
+        
+        if priority < len(QUERY_TYPES):
+            query_type, k_docs, _ = QUERY_TYPES[priority]
         else:
             query_type = "general"
             k_docs = 5
         
-        return {
-            "type": query_type,
-            "k_docs": k_docs,
-            "complexity": len(query.split())
-        }
+        return QueryAnalysis(type=query_type, k_docs=k_docs, complexity=len(query.split()))
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query - concurrent requests share one forward pass"""
+        return self._embedding_batcher.embed(query)
     
-    def retrieve_context(self, query: str, analysis: Dict = None) -> List[str]:
-        """Retrieve relevant context with smart deduplication"""
+    def retrieve_context(
+        self,
+        query: str,
+        analysis: QueryAnalysis = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[str]:
+        """Retrieve relevant context with smart deduplication
+        
+        Pass query_embedding when the query was already embedded in this request.
+        """
         if not self.is_initialized:
             raise RuntimeError("RAG system not initialized. Call initialize() first.")
         
         analysis = analysis or self.analyze_query(query)
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
         
-        # Get documents - Updated to use invoke() method
-        try:
-            # Try the new method first
-            context_docs = self.retriever.invoke(query)
-        except AttributeError:
-            # Fallback to older method if available
-            context_docs = self.retriever.get_relevant_documents(query)
+        context_docs = self.vectorstore.similarity_search_by_vector(
+            query_embedding, k=analysis.k_docs * config.DEDUP_FETCH_MULTIPLIER
+        )
         
+        return self.select_context(context_docs, analysis)
+    
+    def select_context(self, context_docs: List[Any], analysis: QueryAnalysis) -> List[str]:
+        """Pick the passages to send to the model, dropping duplicates"""
         if not context_docs:
             return []
         
         # Smart context selection and deduplication
         context_parts = []
         seen_content = set()
-        max_docs = analysis["k_docs"]
+        max_docs = analysis.k_docs
+        near_duplicates = _new_near_duplicate_index()
         
-        for doc in context_docs[:max_docs]:
+        # Hoist per-passage lookups out of the loop
+        seen_add = seen_content.add
+        append = context_parts.append
+        is_near_duplicate = near_duplicates.is_duplicate if near_duplicates is not None else None
+        
+        # Candidates are over-fetched, so keep scanning until max_docs distinct passages
+        for doc in context_docs:
             content = doc.page_content.strip()
+            if len(content) <= 50:
+                continue
+            
+            # Stable hash of the whole passage, ignoring case and whitespace differences
+            content_hash = content_digest(" ".join(content.lower().split()).encode("utf-8"))
+            if content_hash in seen_content:
+                continue
+            seen_add(content_hash)
             
-            # Create a hash for duplicate detection
-            content_hash = hash(content[:100])  # Use first 100 chars for similarity
+            # Near-duplicate check (overlapping chunks, reformatted copies)
+            if is_near_duplicate is not None and is_near_duplicate(content_hash, content):
+                continue
             
-            if content_hash not in seen_content and len(content) > 50:
-                context_parts.append(content)
-                seen_content.add(content_hash)
+            append(content)
+            if len(context_parts) == max_docs:
+                break
         
         return context_parts
     
-    def create_enhanced_prompt(self, query: str, context_parts: List[str], analysis: Dict) -> str:
+    def create_enhanced_prompt(self, query: str, context_parts: List[str], analysis: QueryAnalysis) -> str:
         """Create an enhanced prompt based on query analysis"""
+        specific_instruction = TYPE_INSTRUCTIONS.get(analysis.type, TYPE_INSTRUCTIONS["general"])
         
-        context = "\n\n---\n\n".join(context_parts)
-        
-        # Base system instructions
-        base_instructions = """You are an expert on the Harry Potter series with deep knowledge of all seven books. Use the provided context to answer the user's question comprehensively and accurately."""
+        # The static prefix comes first, byte-for-byte identical, so it can be prefix-cached
+        return "".join((
+            _PROMPT_HEAD,
+            _CONTEXT_SEPARATOR.join(context_parts),
+            _PROMPT_QUESTION,
+            query,
+            _PROMPT_FOCUS,
+            specific_instruction,
+            _PROMPT_TAIL
+        ))
+    
+    def lookup_semantic_cache(self, query_embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Return the cached answer for a near-duplicate query, if any"""
+        if self.semantic_cache is None:
+            return None
         
-        # Query-specific instructions
-        type_instructions = {
-            "character_analysis": "Focus on character development, personality traits, relationships, and key moments. Reference specific books when possible.",
-            "plot_summary": "Organize information chronologically and provide a comprehensive overview of events. Include key details and outcomes.",
-            "detail_query": "Be specific and precise with facts. Provide exact details and reference the source material.",
-            "comparison": "Clearly contrast the different elements being compared. Use structured comparisons and specific examples.",
-            "general": "Provide a well-rounded answer that covers all relevant aspects of the topic."
-        }
+        try:
+            hits = self.semantic_cache.similarity_search_by_vector_with_relevance_scores(query_embedding, k=1)
+        except Exception as e:
+            print(f"⚠️ Semantic cache lookup failed: {e}")
+            return None
         
-        specific_instruction = type_instructions.get(analysis["type"], type_instructions["general"])
+        # Scores are cosine distances - smaller is more similar
+        if hits and hits[0][1] <= config.SEMANTIC_CACHE_MAX_DISTANCE:
+            return hits[0][0].metadata
+        return None
+    
+    def store_semantic_cache(self, query: str, query_embedding: List[float], response: str, num_sources: int):
+        """Remember an answer so paraphrases of the query can reuse it"""
+        if self.semantic_cache is None:
+            return
         
-        prompt = f"""{base_instructions}
-
-**Context from Harry Potter books:**
-{context}
-
-**User Question:** {query}
-
-**Instructions:**
-- {specific_instruction}
-- Reference specific books, characters, or events when relevant
-- If you're not completely certain about something, acknowledge it
-- Keep the magical tone but be informative and accurate
-- Structure your response clearly
+        try:
+            # Add through the collection so the query is not embedded a second time
+            self.semantic_cache._collection.add(
+                ids=[str(uuid.uuid4())],
+                embeddings=[query_embedding],
+                documents=[query],
+                metadatas=[{"answer": response, "num_sources": num_sources}]
+            )
+        except Exception as e:
+            print(f"⚠️ Could not update semantic cache: {e}")
+    
+    def format_response(self, response: str, num_sources: int, analysis: QueryAnalysis) -> str:
+        """Wrap a model answer with the magical source footer"""
+        return f"""🔮 **Magical Knowledge Retrieved:**
 
-**Answer:**"""
+{response}
 
-        return prompt
+---
+✨ *Answer compiled from {num_sources} relevant passages across the Harry Potter books*  
+🏰 *Query type: {analysis.type.replace('_', ' ').title()}*"""
+    
+    def finalize_response(
+        self,
+        query: str,
+        query_embedding: Optional[List[float]],
+        response: str,
+        context_parts: List[str],
+        analysis: QueryAnalysis,
+        cache_key: str,
+        is_cached: bool
+    ) -> str:
+        """Cache a successful answer and format it for display"""
+        if response and not any(error_word in response.lower() for error_word in ["sorry", "error", "failed", "unavailable"]):
+            num_sources = len(context_parts)
+            
+            if not is_cached:
+                self.response_cache.put(cache_key, response)
+            if query_embedding is not None:
+                self.store_semantic_cache(query, query_embedding, response, num_sources)
+            
+            return self.format_response(response, num_sources, analysis)
+        else:
+            return f"🧙‍♂️ **Magical Response:** {response}"
+    
+    def _prepare(self, query: str):
+        """Run everything that comes before generation
+        
+        Returns either a finished reply (validation message, semantic cache hit or
+        no-context message) or a tuple of (analysis, query_embedding, context_parts,
+        prompt, cache_key, cached_response), where cached_response is None on a
+        response cache miss.
+        """
+        # Input validation
+        if not query or not query.strip():
+            return EMPTY_QUERY_MESSAGE
+        
+        if not self.is_initialized:
+            return NOT_INITIALIZED_MESSAGE
+        
+        query = query.strip()
+        
+        # Analyze query
+        analysis = self.analyze_query(query)
+        
+        # Paraphrases of an answered question skip retrieval and generation
+        query_embedding = None
+        if self.semantic_cache is not None:
+            query_embedding = self.embed_query(query)
+            cached = self.lookup_semantic_cache(query_embedding)
+            if cached is not None:
+                return self.format_response(cached["answer"], cached["num_sources"], analysis)
+        
+        # Retrieve context
+        context_parts = self.retrieve_context(query, analysis, query_embedding)
+        
+        if not context_parts:
+            return NO_CONTEXT_MESSAGE
+        
+        # Create enhanced prompt - identical prompts are answered from cache
+        prompt = self.create_enhanced_prompt(query, context_parts, analysis)
+        cache_key = self.response_cache.make_key(prompt)
+        
+        return analysis, query_embedding, context_parts, prompt, cache_key, self.response_cache.get(cache_key)
+    
+    def _pipeline_error(self, e: Exception) -> str:
+        """Log an unexpected pipeline failure and word it for the user"""
+        error_msg = f"An error occurred in the magical pipeline: {str(e)}"
+        print(f"❌ {error_msg}")
+        return f"🚨 **Spell Malfunction:** {error_msg}"
     
     def generate_response(self, query: str) -> str:
         """Generate a complete RAG response"""
         try:
-            # Input validation
-            if not query or not query.strip():
-                return "🪄 Please cast a question spell by typing your query!"
+            prepared = self._prepare(query)
+            if isinstance(prepared, str):
+                return prepared
             
-            if not self.is_initialized:
-                return "🚨 RAG system not initialized. Please check the setup."
+            analysis, query_embedding, context_parts, prompt, cache_key, response = prepared
+            is_cached = response is not None
+            if not is_cached:
+                response = groq_client.chat(prompt)
             
-            query = query.strip()
+            return self.finalize_response(query.strip(), query_embedding, response, context_parts, analysis, cache_key, is_cached)
+                
+        except Exception as e:
+            return self._pipeline_error(e)
+    
+    def format_partial(self, partial: str) -> str:
+        """Format an answer that is still being generated"""
+        return f"""🔮 **Magical Knowledge Retrieved:**
+
+{partial}▌"""
+    
+    def generate_response_stream(self, query: str) -> Iterator[str]:
+        """Generate a RAG response, yielding the formatted answer as tokens arrive
+        
+        Each yielded value is the full text so far, so the UI can simply
+        replace its output with the latest one.
+        """
+        try:
+            prepared = self._prepare(query)
+            if isinstance(prepared, str):
+                yield prepared
+                return
             
-            # Analyze query
-            analysis = self.analyze_query(query)
+            # Cached answers are shown at once, everything else is streamed
+            analysis, query_embedding, context_parts, prompt, cache_key, response = prepared
+            is_cached = response is not None
+            if not is_cached:
+                parts = []
+                try:
+                    for content in groq_client.chat_stream(prompt):
+                        parts.append(content)
+                        yield self.format_partial("".join(parts))
+                except StreamInterruptedError:
+                    # Show what arrived, but never cache or footer a cut-off answer
+                    yield f"🧙‍♂️ **Magical Response:** {''.join(parts)}\n\n⚠️ *The answer was cut off - please cast the spell again.*"
+                    return
+                response = "".join(parts)
             
-            # Retrieve context
-            context_parts = self.retrieve_context(query, analysis)
+            yield self.finalize_response(query.strip(), query_embedding, response, context_parts, analysis, cache_key, is_cached)
             
-            if not context_parts:
-                return "🔍 I couldn't find relevant information in the Harry Potter books for your query. Try rephrasing your question or asking about specific characters, events, or magical elements."
+        except Exception as e:
+            yield self._pipeline_error(e)
+    
+    async def generate_response_async(self, query: str) -> str:
+        """Generate a complete RAG response without blocking the event loop
+        
+        The blocking pre-generation steps run on the worker pool and generation
+        uses the async Groq client, so concurrent requests overlap instead of
+        queueing. Await groq_client.aclose() before shutting down the event loop.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            prepared = await loop.run_in_executor(self._pool, self._prepare, query)
+            if isinstance(prepared, str):
+                return prepared
             
-            # Create enhanced prompt
-            prompt = self.create_enhanced_prompt(query, context_parts, analysis)
+            analysis, query_embedding, context_parts, prompt, cache_key, response = prepared
+            is_cached = response is not None
+            if not is_cached:
+                response = await groq_client.chat_async(prompt)
             
-            # Generate response using Groq
-            response = groq_client.chat(prompt)
+            return await loop.run_in_executor(
+                self._pool, self.finalize_response,
+                query.strip(), query_embedding, response, context_parts, analysis, cache_key, is_cached
+            )
             
-            # Format final response
-            if response and not any(error_word in response.lower() for error_word in ["sorry", "error", "failed", "unavailable"]):
-                num_sources = len(context_parts)
-                
-                enhanced_response = f"""🔮 **Magical Knowledge Retrieved:**
-
-{response}
-
----
-✨ *Answer compiled from {num_sources} relevant passages across the Harry Potter books*  
-🏰 *Query type: {analysis['type'].replace('_', ' ').title()}*"""
-                
-                return enhanced_response
-            else:
-                return f"🧙‍♂️ **Magical Response:** {response}"
-                
         except Exception as e:
-            error_msg = f"An error occurred in the magical pipeline: {str(e)}"
-            print(f"❌ {error_msg}")
-            return f"🚨 **Spell Malfunction:** {error_msg}"
+            return self._pipeline_error(e)
     
-    def get_system_stats(self) -> Dict[str, Any]:
-        """Get system statistics"""
+    def get_system_stats(self, probe: bool = False) -> Dict[str, Any]:
+        """Get system statistics
+        
+        By default the document count found by the last startup retrieval is
+        reported. Pass probe=True to run a live retrieval and refresh it.
+        """
         if not self.is_initialized:
             return {"status": "not_initialized"}
         
         try:
-            # Test retrieval - Updated to use invoke() method
-            try:
-                test_docs = self.retriever.invoke("test")
-            except AttributeError:
-                test_docs = self.retriever.get_relevant_documents("test")
+            if probe:
+                self.test_documents_found = len(
+                    self.vectorstore.similarity_search_by_vector(
+                        self.embedding_model.embed_query("Harry Potter"), k=config.RETRIEVAL_K
+                    )
+                )
             
             return {
                 "status": "ready",
                 "database_path": self.chroma_db_path,
                 "embedding_model": config.EMBEDDING_MODEL,
                 "collection_name": config.COLLECTION_NAME,
-                "test_documents_found": len(test_docs),
+                "collection_count": self.collection_count,
+                "test_documents_found": self.test_documents_found,
                 "retrieval_k": config.RETRIEVAL_K,
-                "is_functional": len(test_docs) > 0
+                "is_functional": self.test_documents_found > 0
             }
         except Exception as e:
             return {
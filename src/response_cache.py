@@ -0,0 +1,115 @@
+# src/response_cache.py - Two-tier LLM response cache for Harry Potter RAG System
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from fast_hash import cache_key
+
+class ResponseCache:
+    """Bounded in-memory LRU backed by an optional SQLite file for persistence
+
+    Entries older than ttl seconds are treated as misses, and the SQLite tier
+    keeps at most max_rows of the newest responses.
+    """
+
+    def __init__(self, max_size: int = 512, db_path: Path = None,
+                 max_rows: int = 10000, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path is not None:
+            try:
+                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL DEFAULT 0)"
+                )
+                # Tables written before expiry existed have no timestamp column
+                columns = {row[1] for row in self._db.execute("PRAGMA table_info(responses)")}
+                if "created_at" not in columns:
+                    self._db.execute("ALTER TABLE responses ADD COLUMN created_at REAL NOT NULL DEFAULT 0")
+                self._db.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+                self._prune()
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Persistent response cache disabled: {e}")
+                self._db = None
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        """Stable digest of the text that determines a response"""
+        return cache_key(text)
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def _remember(self, key: str, response: str, created_at: float):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def _prune(self):
+        """Drop expired rows and everything beyond the newest max_rows"""
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+        if self.max_rows is not None:
+            self._db.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY created_at DESC LIMIT ?)",
+                (self.max_rows,)
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a response, promoting SQLite hits into memory"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._memory.move_to_end(key)
+                    return entry[0]
+                del self._memory[key]
+
+            if self._db is None:
+                return None
+
+            row = self._db.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self._expired(row[1]):
+                return None
+
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response in both tiers"""
+        with self._lock:
+            created_at = time.time()
+            self._remember(key, response, created_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                        (key, response, created_at)
+                    )
+                    self._prune()
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Could not persist cached response: {e}")
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
@@ -1,176 +1,349 @@
 # src/ui_components.py - Harry Potter RAG UI Components
-import gradio as gr
+import functools
+import html
+import itertools
 import random
+import re
+import threading
+from collections import OrderedDict
+
+from config import config
+
+# Static stylesheet, built once at import rather than on every interface build
+_CSS_SOURCE = """
+.gradio-container {
+    background: linear-gradient(135deg, #0f0f23 0%, #1a1a2e 50%, #16213e 100%) !important;
+    font-family: 'Georgia', serif !important;
+}
+
+.main-header {
+    background: linear-gradient(45deg, #ffd700, #ffed4e, #ffd700) !important;
+    -webkit-background-clip: text !important;
+    -webkit-text-fill-color: transparent !important;
+    background-clip: text !important;
+    text-align: center !important;
+    font-size: 2.5em !important;
+    font-weight: bold !important;
+    text-shadow: 2px 2px 4px rgba(0,0,0,0.5) !important;
+    margin: 20px 0 !important;
+}
+
+.magical-border {
+    border: 2px solid #ffd700 !important;
+    border-radius: 15px !important;
+    background: rgba(255, 215, 0, 0.1) !important;
+    box-shadow: 0 0 20px rgba(255, 215, 0, 0.3) !important;
+    padding: 20px !important;
+    margin: 15px 0 !important;
+}
+
+.spell-button {
+    background: linear-gradient(45deg, #1a1a2e, #16213e) !important;
+    border: 2px solid #ffd700 !important;
+    color: #ffd700 !important;
+    border-radius: 25px !important;
+    padding: 10px 20px !important;
+    font-weight: bold !important;
+    transition: all 0.3s ease !important;
+}
+
+.spell-button:hover {
+    background: linear-gradient(45deg, #ffd700, #ffed4e) !important;
+    color: #1a1a2e !important;
+    box-shadow: 0 0 15px rgba(255, 215, 0, 0.5) !important;
+    transform: translateY(-2px) !important;
+}
+
+.magical-text {
+    color: #e6e6fa !important;
+    text-shadow: 1px 1px 2px rgba(0,0,0,0.7) !important;
+}
+
+.golden-text {
+    color: #ffd700 !important;
+    font-weight: bold !important;
+    text-shadow: 1px 1px 2px rgba(0,0,0,0.8) !important;
+}
+
+.response-box {
+    background: rgba(30, 30, 60, 0.8) !important;
+    border: 1px solid #ffd700 !important;
+    border-radius: 10px !important;
+    padding: 15px !important;
+    color: #e6e6fa !important;
+    font-family: 'Georgia', serif !important;
+    line-height: 1.6 !important;
+    box-shadow: inset 0 0 10px rgba(255, 215, 0, 0.1) !important;
+}
+
+.example-card {
+    background: rgba(255, 215, 0, 0.1) !important;
+    border: 1px solid #ffd700 !important;
+    border-radius: 10px !important;
+    padding: 15px !important;
+    transition: all 0.3s ease !important;
+    cursor: pointer !important;
+    display: block !important;
+    width: 100% !important;
+    margin: 8px 0 !important;
+    color: #e6e6fa !important;
+    text-align: left !important;
+}
+
+.example-card:hover {
+    background: rgba(255, 215, 0, 0.2) !important;
+    transform: translateY(-5px) !important;
+    box-shadow: 0 5px 15px rgba(255, 215, 0, 0.3) !important;
+}
+
+.stats-container {
+    display: flex !important;
+    justify-content: space-around !important;
+    background: rgba(255, 215, 0, 0.1) !important;
+    border-radius: 15px !important;
+    padding: 20px !important;
+    margin: 20px 0 !important;
+}
+
+.stat-item {
+    text-align: center !important;
+    color: #ffd700 !important;
+}
+"""
+
+# Gradio inlines the stylesheet into every page, so ship it minified
+CUSTOM_CSS = re.sub(r"\s*([{};:,])\s*", r"\1", re.sub(r"\s+", " ", _CSS_SOURCE)).strip()
+
+# Handler messages
+_EMPTY_QUERY_MESSAGE = "🪄 Please cast a question spell by typing your query above!"
+_ERROR_PREFIX = "🚨 **Magical Error:** The spell backfired! "
+
+# Only successful pipeline answers start with this header, so only they are cached
+_ANSWER_HEADER = "🔮"
+
+# Example buttons are plain HTML, so one delegated listener copies a clicked
+# example into the query box without any Gradio component or server event
+_EXAMPLE_SCRIPT = """
+<script>
+document.addEventListener("click", (event) => {
+    const example = event.target.closest(".example-card[data-query]");
+    const input = document.querySelector("#query-input textarea");
+    if (!example || !input) return;
+    input.value = example.dataset.query;
+    input.dispatchEvent(new Event("input", { bubbles: true }));
+});
+</script>
+"""
+
+def _gold(text: str, size: str = "1.3em", layout: str = "margin-bottom: 10px;") -> str:
+    """Golden section heading"""
+    return f'<div class="golden-text" style="font-size: {size}; {layout}">{text}</div>'
+
+def _examples_html(examples) -> str:
+    """Render a category of example queries as static buttons"""
+    return "".join(
+        f'<button type="button" class="example-card" data-query="{html.escape(example)}">{html.escape(example)}</button>'
+        for example in examples
+    )
+
+# Static page fragments, formatted once at import
+_HEADER_HTML = """
+<div class="main-header">
+    ⚡ MAGICAL HARRY POTTER RAG ASSISTANT 🏰
+</div>
+<div style="text-align: center; color: #ffd700; font-size: 1.2em; margin-bottom: 20px;">
+    <em>"Wit beyond measure is man's greatest treasure" - Ravenclaw House</em>
+</div>
+"""
+
+_QUOTE_HTML = """
+<div style="text-align: center; color: #e6e6fa; font-style: italic; margin: 15px 0; padding: 10px; background: rgba(255,215,0,0.1); border-radius: 10px;">
+    {quote}
+</div>
+"""
+
+_STATS_HTML = """
+<div class="stats-container">
+    <div class="stat-item">
+        <div style="font-size: 2em;">📚</div>
+        <div>7 Books</div>
+    </div>
+    <div class="stat-item">
+        <div style="font-size: 2em;">🧩</div>
+        <div>1000+ Chunks</div>
+    </div>
+    <div class="stat-item">
+        <div style="font-size: 2em;">⚡</div>
+        <div>AI Powered</div>
+    </div>
+</div>
+"""
+
+_SPECIALIZED_HTML = """
+<div class="magical-border">
+    <h3 class="golden-text">🎯 Specialized Queries</h3>
+    <ul class="magical-text">
+        <li><strong>Character Analysis:</strong> Deep dive into character development</li>
+        <li><strong>Plot Summaries:</strong> Comprehensive event overviews</li>
+        <li><strong>Trivia Questions:</strong> Specific details and facts</li>
+        <li><strong>World Building:</strong> Magical world explanations</li>
+    </ul>
+</div>
+"""
+
+_CAPABILITIES_HTML = """
+<div class="magical-border">
+    <h3 class="golden-text">✨ AI Capabilities</h3>
+    <ul class="magical-text">
+        <li><strong>Context Retrieval:</strong> Finds relevant book passages</li>
+        <li><strong>Smart Summarization:</strong> Condenses complex information</li>
+        <li><strong>Query Analysis:</strong> Optimizes retrieval strategy</li>
+        <li><strong>Response Enhancement:</strong> Adds magical formatting</li>
+    </ul>
+</div>
+"""
+
+_FOOTER_HTML = """
+<div style="text-align: center; margin-top: 30px; padding: 20px; background: rgba(255,215,0,0.1); border-radius: 10px;">
+    <div class="golden-text" style="font-size: 1.2em; margin-bottom: 10px;">
+        🏰 Powered by Advanced RAG Magic 🏰
+    </div>
+    <div class="magical-text">
+        Combining the wisdom of all 7 Harry Potter books with cutting-edge AI<br>
+        <em>"After all this time?" "Always." - Severus Snape</em>
+    </div>
+</div>
+"""
 
 class HarryPotterUI:
     def __init__(self):
-        self.magical_quotes = [
+        self.magical_quotes = (
             "⚡ 'It is our choices, Harry, that show what we truly are, far more than our abilities.' - Dumbledore",
             "🦌 'Happiness can be found, even in the darkest of times, if one only remembers to turn on the light.' - Dumbledore",
             "🪶 'Words are, in my not-so-humble opinion, our most inexhaustible source of magic.' - Dumbledore",
             "🔮 'It does not do to dwell on dreams and forget to live.' - Dumbledore",
             "⭐ 'We've all got both light and dark inside us. What matters is the part we choose to act on.' - Sirius Black"
-        ]
+        )
         
         self.query_examples = {
-            "🧙‍♂️ Character Analysis": [
+            "🧙‍♂️ Character Analysis": (
                 "How does Snape's character develop throughout the series?",
                 "What are the key traits of Hermione Granger?",
                 "Describe Harry's relationship with his father figures",
                 "How does Draco Malfoy change over the books?"
-            ],
-            "📚 Plot & Events": [
+            ),
+            "📚 Plot & Events": (
                 "Summarize the Triwizard Tournament from Goblet of Fire",
                 "What happens during the Battle of Hogwarts?",
                 "Explain the events of the Department of Mysteries",
                 "Tell me about Harry's first Quidditch match"
-            ],
-            "🔍 Trivia & Details": [
+            ),
+            "🔍 Trivia & Details": (
                 "What is Harry Potter's patronus and how did he learn it?",
                 "What are the Deathly Hallows and their significance?",
                 "How do you make a Polyjuice Potion?",
                 "Who are the original members of the Order of the Phoenix?"
-            ],
-            "🏰 World Building": [
+            ),
+            "🏰 World Building": (
                 "Describe the different houses at Hogwarts",
                 "What is the history of the Marauder's Map?",
                 "Explain the wizarding government structure",
                 "Tell me about magical creatures in the series"
-            ]
-        }
-
-    def create_custom_css(self):
-        return """
-        .gradio-container {
-            background: linear-gradient(135deg, #0f0f23 0%, #1a1a2e 50%, #16213e 100%) !important;
-            font-family: 'Georgia', serif !important;
-        }
-        
-        .main-header {
-            background: linear-gradient(45deg, #ffd700, #ffed4e, #ffd700) !important;
-            -webkit-background-clip: text !important;
-            -webkit-text-fill-color: transparent !important;
-            background-clip: text !important;
-            text-align: center !important;
-            font-size: 2.5em !important;
-            font-weight: bold !important;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.5) !important;
-            margin: 20px 0 !important;
-        }
-        
-        .magical-border {
-            border: 2px solid #ffd700 !important;
-            border-radius: 15px !important;
-            background: rgba(255, 215, 0, 0.1) !important;
-            box-shadow: 0 0 20px rgba(255, 215, 0, 0.3) !important;
-            padding: 20px !important;
-            margin: 15px 0 !important;
-        }
-        
-        .spell-button {
-            background: linear-gradient(45deg, #1a1a2e, #16213e) !important;
-            border: 2px solid #ffd700 !important;
-            color: #ffd700 !important;
-            border-radius: 25px !important;
-            padding: 10px 20px !important;
-            font-weight: bold !important;
-            transition: all 0.3s ease !important;
-        }
-        
-        .spell-button:hover {
-            background: linear-gradient(45deg, #ffd700, #ffed4e) !important;
-            color: #1a1a2e !important;
-            box-shadow: 0 0 15px rgba(255, 215, 0, 0.5) !important;
-            transform: translateY(-2px) !important;
+            )
         }
         
-        .magical-text {
-            color: #e6e6fa !important;
-            text-shadow: 1px 1px 2px rgba(0,0,0,0.7) !important;
-        }
+        # Flattened once for the random question button
+        self._all_examples = tuple(itertools.chain.from_iterable(self.query_examples.values()))
         
-        .golden-text {
-            color: #ffd700 !important;
-            font-weight: bold !important;
-            text-shadow: 1px 1px 2px rgba(0,0,0,0.8) !important;
+        # Rendered once - examples are static for the lifetime of the UI
+        self._example_html = {
+            category: _examples_html(examples) for category, examples in self.query_examples.items()
         }
         
-        .response-box {
-            background: rgba(30, 30, 60, 0.8) !important;
-            border: 1px solid #ffd700 !important;
-            border-radius: 10px !important;
-            padding: 15px !important;
-            color: #e6e6fa !important;
-            font-family: 'Georgia', serif !important;
-            line-height: 1.6 !important;
-            box-shadow: inset 0 0 10px rgba(255, 215, 0, 0.1) !important;
-        }
+        # LRU of finished answers - example and random questions repeat often
+        self._answer_cache = OrderedDict()
+        self._answer_cache_lock = threading.Lock()
+    
+    def _cached_answer(self, key: str):
+        """Return a cached answer for a normalized query, or None"""
+        with self._answer_cache_lock:
+            answer = self._answer_cache.get(key)
+            if answer is not None:
+                self._answer_cache.move_to_end(key)
+            return answer
+    
+    def _cache_answer(self, key: str, answer: str):
+        """Remember a successful answer, dropping the least recently used"""
+        if not answer.startswith(_ANSWER_HEADER):
+            return
+        with self._answer_cache_lock:
+            self._answer_cache[key] = answer
+            self._answer_cache.move_to_end(key)
+            while len(self._answer_cache) > config.UI_CACHE_SIZE:
+                self._answer_cache.popitem(last=False)
+
+    def get_random_question(self) -> str:
+        """Pick a random example question"""
+        return random.choice(self._all_examples)
+    
+    def enhanced_rag_pipeline(self, rag_pipeline_func, query):
+        """Run the RAG pipeline for the UI - a generator so Gradio streams partial answers"""
+        if not query or query.isspace():
+            yield _EMPTY_QUERY_MESSAGE
+            return
         
-        .example-card {
-            background: rgba(255, 215, 0, 0.1) !important;
-            border: 1px solid #ffd700 !important;
-            border-radius: 10px !important;
-            padding: 15px !important;
-            transition: all 0.3s ease !important;
-            cursor: pointer !important;
-        }
+        # Repeated questions are answered without touching the pipeline
+        key = " ".join(query.lower().split())
+        cached = self._cached_answer(key)
+        if cached is not None:
+            yield cached
+            return
         
-        .example-card:hover {
-            background: rgba(255, 215, 0, 0.2) !important;
-            transform: translateY(-5px) !important;
-            box-shadow: 0 5px 15px rgba(255, 215, 0, 0.3) !important;
-        }
+        try:
+            result = rag_pipeline_func(query)
+            if isinstance(result, str):
+                answer = result
+                yield answer
+            else:
+                # Streamed - every partial is the full text so far
+                answer = ""
+                for answer in result:
+                    yield answer
         
-        .stats-container {
-            display: flex !important;
-            justify-content: space-around !important;
-            background: rgba(255, 215, 0, 0.1) !important;
-            border-radius: 15px !important;
-            padding: 20px !important;
-            margin: 20px 0 !important;
-        }
+            self._cache_answer(key, answer)
         
-        .stat-item {
-            text-align: center !important;
-            color: #ffd700 !important;
-        }
-        """
+        except Exception as e:
+            yield _ERROR_PREFIX + str(e)
+    
+    def create_custom_css(self):
+        return CUSTOM_CSS
 
     def create_advanced_interface(self, rag_pipeline_func):
         """Create the advanced interface - matches the method name in main.py"""
         return self.create_interface(rag_pipeline_func)
 
     def create_interface(self, rag_pipeline_func):
-        css = self.create_custom_css()
+        # Gradio pulls in FastAPI/uvicorn/pydantic - only pay for it when building the UI
+        import gradio as gr
         
-        with gr.Blocks(css=css, title="⚡ Magical Harry Potter RAG Assistant") as interface:
+        with gr.Blocks(css=CUSTOM_CSS, head=_EXAMPLE_SCRIPT, title="⚡ Magical Harry Potter RAG Assistant") as interface:
             # Header Section
-            gr.HTML("""
-                <div class="main-header">
-                    ⚡ MAGICAL HARRY POTTER RAG ASSISTANT 🏰
-                </div>
-                <div style="text-align: center; color: #ffd700; font-size: 1.2em; margin-bottom: 20px;">
-                    <em>"Wit beyond measure is man's greatest treasure" - Ravenclaw House</em>
-                </div>
-            """)
+            gr.HTML(_HEADER_HTML)
             
-            # Static magical quote (removed auto-refresh to fix compatibility)
-            gr.HTML(f'''
-                <div style="text-align: center; color: #e6e6fa; font-style: italic; margin: 15px 0; padding: 10px; background: rgba(255,215,0,0.1); border-radius: 10px;">
-                    {random.choice(self.magical_quotes)}
-                </div>
-            ''')
+            # Static magical quote, picked once per interface build (removed auto-refresh to fix compatibility)
+            gr.HTML(_QUOTE_HTML.format(quote=random.choice(self.magical_quotes)))
             
             # Main interaction area
             with gr.Row():
                 with gr.Column(scale=2):
                     with gr.Group():
-                        gr.HTML('<div class="golden-text" style="font-size: 1.3em; margin-bottom: 10px;">🔮 Ask the Magical Oracle</div>')
+                        gr.HTML(_gold("🔮 Ask the Magical Oracle"))
                         
                         query_input = gr.Textbox(
                             label="",
                             placeholder="Ask me anything about the magical world of Harry Potter...",
                             lines=3,
+                            elem_id="query-input",
                             elem_classes=["magical-border"]
                         )
                         
@@ -180,27 +353,12 @@ class HarryPotterUI:
                             random_btn = gr.Button("🎲 Random Question", variant="secondary", elem_classes=["spell-button"])
                 
                 with gr.Column(scale=1):
-                    gr.HTML('<div class="golden-text" style="font-size: 1.3em; margin-bottom: 10px;">📊 Knowledge Stats</div>')
-                    stats_html = gr.HTML("""
-                        <div class="stats-container">
-                            <div class="stat-item">
-                                <div style="font-size: 2em;">📚</div>
-                                <div>7 Books</div>
-                            </div>
-                            <div class="stat-item">
-                                <div style="font-size: 2em;">🧩</div>
-                                <div>1000+ Chunks</div>
-                            </div>
-                            <div class="stat-item">
-                                <div style="font-size: 2em;">⚡</div>
-                                <div>AI Powered</div>
-                            </div>
-                        </div>
-                    """)
+                    gr.HTML(_gold("📊 Knowledge Stats"))
+                    stats_html = gr.HTML(_STATS_HTML)
             
             # Response area
             with gr.Group():
-                gr.HTML('<div class="golden-text" style="font-size: 1.3em; margin-bottom: 10px;">📜 Magical Response</div>')
+                gr.HTML(_gold("📜 Magical Response"))
                 response_output = gr.Textbox(
                     label="",
                     lines=12,
@@ -209,75 +367,29 @@ class HarryPotterUI:
                 )
             
             # Example queries
-            gr.HTML('<div class="golden-text" style="font-size: 1.5em; text-align: center; margin: 30px 0 20px 0;">🎭 Magical Query Categories</div>')
+            gr.HTML(_gold("🎭 Magical Query Categories", size="1.5em", layout="text-align: center; margin: 30px 0 20px 0;"))
             
             with gr.Tabs():
-                for category, examples in self.query_examples.items():
+                for category, example_html in self._example_html.items():
                     with gr.TabItem(category):
-                        for example in examples:
-                            btn = gr.Button(
-                                example, 
-                                elem_classes=["example-card"],
-                                variant="secondary"
-                            )
-                            
-                            # Connect each example button to input
-                            btn.click(
-                                fn=lambda x=example: x,
-                                outputs=query_input
-                            )
+                        gr.HTML(example_html)
             
             # Advanced features section
             with gr.Accordion("🔧 Advanced Magical Features", open=False):
                 with gr.Row():
                     with gr.Column():
-                        gr.HTML("""
-                            <div class="magical-border">
-                                <h3 class="golden-text">🎯 Specialized Queries</h3>
-                                <ul class="magical-text">
-                                    <li><strong>Character Analysis:</strong> Deep dive into character development</li>
-                                    <li><strong>Plot Summaries:</strong> Comprehensive event overviews</li>
-                                    <li><strong>Trivia Questions:</strong> Specific details and facts</li>
-                                    <li><strong>World Building:</strong> Magical world explanations</li>
-                                </ul>
-                            </div>
-                        """)
+                        gr.HTML(_SPECIALIZED_HTML)
                     
                     with gr.Column():
-                        gr.HTML("""
-                            <div class="magical-border">
-                                <h3 class="golden-text">✨ AI Capabilities</h3>
-                                <ul class="magical-text">
-                                    <li><strong>Context Retrieval:</strong> Finds relevant book passages</li>
-                                    <li><strong>Smart Summarization:</strong> Condenses complex information</li>
-                                    <li><strong>Query Analysis:</strong> Optimizes retrieval strategy</li>
-                                    <li><strong>Response Enhancement:</strong> Adds magical formatting</li>
-                                </ul>
-                            </div>
-                        """)
-            
-            # Function to get random question
-            def get_random_question():
-                all_examples = [example for examples in self.query_examples.values() for example in examples]
-                return random.choice(all_examples)
-            
-            # Enhanced RAG pipeline wrapper
-            def enhanced_rag_pipeline(query):
-                if not query.strip():
-                    return "🪄 Please cast a question spell by typing your query above!"
-                
-                try:
-                    response = rag_pipeline_func(query)
-                    return response
-                    
-                except Exception as e:
-                    return f"🚨 **Magical Error:** The spell backfired! {str(e)}"
+                        gr.HTML(_CAPABILITIES_HTML)
             
-            # Event handlers
+            # Event handlers - Gradio runs sync generators on worker threads, but only
+            # one at a time per event unless the concurrency limit is raised
             submit_btn.click(
-                fn=enhanced_rag_pipeline,
+                fn=functools.partial(self.enhanced_rag_pipeline, rag_pipeline_func),
                 inputs=query_input,
-                outputs=response_output
+                outputs=response_output,
+                concurrency_limit=config.GRADIO_MAX_THREADS
             )
             
             clear_btn.click(
@@ -286,21 +398,11 @@ class HarryPotterUI:
             )
             
             random_btn.click(
-                fn=get_random_question,
+                fn=self.get_random_question,
                 outputs=query_input
             )
             
             # Footer
-            gr.HTML("""
-                <div style="text-align: center; margin-top: 30px; padding: 20px; background: rgba(255,215,0,0.1); border-radius: 10px;">
-                    <div class="golden-text" style="font-size: 1.2em; margin-bottom: 10px;">
-                        🏰 Powered by Advanced RAG Magic 🏰
-                    </div>
-                    <div class="magical-text">
-                        Combining the wisdom of all 7 Harry Potter books with cutting-edge AI<br>
-                        <em>"After all this time?" "Always." - Severus Snape</em>
-                    </div>
-                </div>
-            """)
+            gr.HTML(_FOOTER_HTML)
         
         return interface
\ No newline at end of file